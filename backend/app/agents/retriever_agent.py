@@ -1,20 +1,21 @@
 # app/agents/retriever_agent.py
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
-from app.memory.embeddings import embed_text
-from app.memory.vector_store import VectorStore
+from app.config import settings
+from app.memory.embeddings import embed_text, embed_text_async, embed_texts, embed_texts_async
+from app.memory.vector_store import DEFAULT_COLLECTION, get_async_vector_store, get_vector_store
 
 
 class RetrieverAgent:
 
     def __init__(self, collection_name: str | None = None):
-        self.vs = VectorStore(collection_name=collection_name) if collection_name else VectorStore()
+        self.vs = get_vector_store(collection_name or DEFAULT_COLLECTION)
 
     def retrieve(
         self,
         query: str,
         top_k: int = 5,
-        filter_by: Optional[Dict[str, str]] = None,
+        filter_by: Optional[Dict[str, Any]] = None,
     ) -> List[Dict]:
         
         q_vec = embed_text(query)
@@ -24,3 +25,56 @@ class RetrieverAgent:
             filter_by=filter_by,
         )
         return hits
+
+    # all queries go through one embed_texts call and batched Qdrant requests
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict]]:
+
+        if not queries:
+            return []
+        q_vecs = embed_texts(queries, batch_size=settings.EMBEDDING_BATCH_SIZE)
+        return self.vs.search_batch(
+            query_embeddings=q_vecs,
+            top_k=top_k,
+            filter_by=filter_by,
+        )
+
+
+class AsyncRetrieverAgent:
+
+    def __init__(self, collection_name: str | None = None):
+        self.vs = get_async_vector_store(collection_name or DEFAULT_COLLECTION)
+
+    async def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
+
+        q_vec = await embed_text_async(query)
+        return await self.vs.search(
+            query_embedding=q_vec,
+            top_k=top_k,
+            filter_by=filter_by,
+        )
+
+    async def retrieve_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict]]:
+
+        if not queries:
+            return []
+        q_vecs = await embed_texts_async(queries, batch_size=settings.EMBEDDING_BATCH_SIZE)
+        return await self.vs.search_batch(
+            query_embeddings=q_vecs,
+            top_k=top_k,
+            filter_by=filter_by,
+        )
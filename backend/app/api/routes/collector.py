@@ -1,22 +1,68 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends
 from sqlalchemy.orm import Session
 
-from ...schemas.collect import CollectItem
+from ...config import settings
+from ...schemas.collect import CollectBatch, CollectItem
 from ...core.db import get_db
-from ...memory.document_store import save_metadata
+from ...memory.document_store import save_metadata_batch
+from ...services.ingestion_pipeline import get_ingestion_pipeline
 
 router = APIRouter()
 
 
+# "existing" and "duplicate" point at a document that is already processed
+_NEEDS_INGESTION = ("created", "replaced")
+
+
+def _ingest_documents(doc_ids):
+    get_ingestion_pipeline().submit(doc_ids)
+
+
 @router.post("/collector/ingest")
-async def ingest_article(item: CollectItem, db: Session = Depends(get_db)):
+async def ingest_article(
+    item: CollectItem,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
 
-    doc_id = save_metadata(db, item)
+    result = save_metadata_batch(db, [item])[0]
+    if settings.INGEST_ON_COLLECT and result["status"] in _NEEDS_INGESTION:
+        background_tasks.add_task(_ingest_documents, [result["doc_id"]])
 
     return {
         "status": "metadata_saved",
-        "doc_id": doc_id,
+        "doc_id": result["doc_id"],
+        "dedup": result["status"],
         "title": item.title,
         "source": item.source,
         "content_type": item.content_type,
     }
+
+
+@router.post("/collector/ingest/batch")
+def ingest_batch(
+    batch: CollectBatch,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+
+    results = save_metadata_batch(db, batch.items)
+    new_ids = [r["doc_id"] for r in results if r["status"] in _NEEDS_INGESTION]
+    if settings.INGEST_ON_COLLECT and new_ids:
+        background_tasks.add_task(_ingest_documents, new_ids)
+
+    return {
+        "status": "ok",
+        "created": sum(r["status"] == "created" for r in results),
+        "existing": sum(r["status"] == "existing" for r in results),
+        "replaced": sum(r["status"] == "replaced" for r in results),
+        "duplicate": sum(r["status"] == "duplicate" for r in results),
+        "items": [
+            {
+                **r,
+                "title": item.title,
+                "url": str(item.url) if item.url else None,
+            }
+            for r, item in zip(results, batch.items)
+        ],
+    }
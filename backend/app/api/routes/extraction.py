@@ -1,15 +1,25 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ...core.db import get_db
-from ...services.text_extraction_service import process_all_documents
+from ...jobs.handlers import JOB_EXTRACT_TEXT
+from ...jobs.runner import get_job_runner
 
 router = APIRouter()
 
 
-@router.post("/extract-text")
-def extract_text_endpoint(db: Session = Depends(get_db)):
-    processed = process_all_documents(db)
+@router.post("/extract-text", status_code=202)
+def extract_text_endpoint(
+    limit: int | None = None,
+    retry_failed: bool = False,
+    reextract: bool = False,
+    db: Session = Depends(get_db),
+):
+    job = get_job_runner().submit(
+        db,
+        JOB_EXTRACT_TEXT,
+        {"limit": limit, "retry_failed": retry_failed, "reextract": reextract},
+    )
     return {
-        "status": "ok",
-        "processed_documents": processed
+        "status": job.status,
+        "job_id": job.id,
     }
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.jobs.handlers import JOB_HARVEST_ARXIV
+from app.jobs.runner import get_job_runner
+from app.memory.models import HarvestCursor
+
+router = APIRouter(prefix="/harvester", tags=["harvester"])
+
+
+class ArxivHarvestRequest(BaseModel):
+    query: str | None = None
+    max_results: int | None = None
+    reset: bool = False
+
+
+@router.post("/arxiv/run", status_code=202)
+def run_arxiv_harvest(request: ArxivHarvestRequest, db: Session = Depends(get_db)):
+    job = get_job_runner().submit(db, JOB_HARVEST_ARXIV, request.model_dump())
+    return {
+        "status": job.status,
+        "job_id": job.id,
+    }
+
+
+@router.get("/cursors")
+def list_cursors(db: Session = Depends(get_db)):
+    cursors = db.query(HarvestCursor).order_by(HarvestCursor.updated_at.desc()).all()
+    return [
+        {
+            "id": c.id,
+            "source": c.source,
+            "query": c.query,
+            "next_start": c.next_start,
+            "total_results": c.total_results,
+            "harvested": c.harvested,
+            "last_published_at": c.last_published_at,
+            "updated_at": c.updated_at,
+        }
+        for c in cursors
+    ]
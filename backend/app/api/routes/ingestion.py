@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.jobs.handlers import JOB_INGEST
+from app.jobs.runner import get_job_runner
+from app.memory.models import Document
+
+router = APIRouter(prefix="/ingestion", tags=["ingestion"])
+
+
+@router.post("/run", status_code=202)
+def run_ingestion_endpoint(limit: int | None = None, db: Session = Depends(get_db)):
+    job = get_job_runner().submit(db, JOB_INGEST, {"limit": limit})
+    return {
+        "status": job.status,
+        "job_id": job.id,
+    }
+
+
+@router.get("/stages")
+def stage_counts(db: Session = Depends(get_db)):
+    rows = db.query(Document.stage, func.count(Document.id)).group_by(Document.stage).all()
+    return {stage: count for stage, count in rows}
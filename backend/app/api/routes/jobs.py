@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.jobs.runner import get_job_runner, job_to_dict
+from app.memory.models import Job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _get_job(db: Session, job_id: str) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("")
+def list_jobs(
+    kind: str | None = None,
+    status: str | None = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+) -> List[dict]:
+    query = db.query(Job)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    if status:
+        query = query.filter(Job.status == status)
+    jobs = query.order_by(Job.created_at.desc()).limit(min(limit, 500)).all()
+    return [job_to_dict(job) for job in jobs]
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    return job_to_dict(_get_job(db, job_id))
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str, db: Session = Depends(get_db)):
+    job = get_job_runner().cancel(db, _get_job(db, job_id))
+    return job_to_dict(job)
+
+
+@router.post("/{job_id}/resume")
+def resume_job(job_id: str, db: Session = Depends(get_db)):
+    try:
+        job = get_job_runner().resume(db, _get_job(db, job_id))
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return job_to_dict(job)
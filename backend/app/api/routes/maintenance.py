@@ -2,24 +2,17 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.core.db import get_db
-from app.memory.models import Document
-from app.cleaning.text_cleaning import clean_raw_text
+from app.jobs.handlers import JOB_CLEAN_TEXT
+from app.jobs.runner import get_job_runner
 
 router = APIRouter(prefix="/maintenance", tags=["maintenance"])
 
 
-@router.post("/clean-text")
-def clean_text_for_all_docs(db: Session = Depends(get_db)):
-    docs = (
-        db.query(Document)
-        .filter(Document.raw_text.isnot(None))
-        .all()
-    )
-
-    count = 0
-    for doc in docs:
-        doc.clean_text = clean_raw_text(doc.raw_text or "")
-        count += 1
-
-    db.commit()
-    return {"updated_documents": count}
\ No newline at end of file
+@router.post("/clean-text", status_code=202)
+def clean_text_for_all_docs(
+    limit: int | None = None,
+    force: bool = False,
+    db: Session = Depends(get_db),
+):
+    job = get_job_runner().submit(db, JOB_CLEAN_TEXT, {"limit": limit, "force": force})
+    return {"status": job.status, "job_id": job.id}
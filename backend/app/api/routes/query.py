@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from app.services.orchestrator_service import run_query
+from app.services.orchestrator_service import arun_query
 
 router = APIRouter(prefix="/query", tags=["query"])
 
@@ -8,8 +8,8 @@ class QueryRequest(BaseModel):
     question: str
 
 @router.post("")
-def query_endpoint(body: QueryRequest):
-    final_state = run_query(body.question)
+async def query_endpoint(body: QueryRequest):
+    final_state = await arun_query(body.question)
 
     return {
         "question": body.question,
@@ -1,9 +1,10 @@
 # app/api/routes/retrieval.py
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Optional, Dict, List
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Any, Optional, Dict, List
 
-from app.agents.retriever_agent import RetrieverAgent
+from app.agents.retriever_agent import AsyncRetrieverAgent
+from app.memory.vector_store import build_filter
 
 router = APIRouter(prefix="/retrieval", tags=["retrieval"])
 
@@ -12,18 +13,36 @@ class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     doc_id: Optional[int] = None  
+    # payload filters, see build_filter: {"year": {"gte": 2023}, "section": ["methods"]}
+    filters: Optional[Dict[str, Any]] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(default_factory=list, max_length=5000)
+    top_k: int = 5
+    doc_id: Optional[int] = None
+    filters: Optional[Dict[str, Any]] = None
+
+
+def _filter_by(doc_id: Optional[int], filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    filter_by = dict(filters or {})
+    if doc_id is not None:
+        filter_by["doc_id"] = doc_id
+    try:
+        build_filter(filter_by)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return filter_by or None
 
 
 @router.post("/search")
-def search_documents(body: SearchRequest):
+async def search_documents(body: SearchRequest):
 
-    agent = RetrieverAgent()
+    agent = AsyncRetrieverAgent()
 
-    filter_by: Optional[Dict[str, str]] = None
-    if body.doc_id is not None:
-        filter_by = {"doc_id": body.doc_id}
+    filter_by = _filter_by(body.doc_id, body.filters)
 
-    hits: List[Dict] = agent.retrieve(
+    hits: List[Dict] = await agent.retrieve(
         query=body.query,
         top_k=body.top_k,
         filter_by=filter_by,
@@ -34,3 +53,25 @@ def search_documents(body: SearchRequest):
         "top_k": body.top_k,
         "results": hits,
     }
+
+
+@router.post("/search/batch")
+async def search_documents_batch(body: BatchSearchRequest):
+
+    agent = AsyncRetrieverAgent()
+
+    filter_by = _filter_by(body.doc_id, body.filters)
+
+    hits: List[List[Dict]] = await agent.retrieve_batch(
+        queries=body.queries,
+        top_k=body.top_k,
+        filter_by=filter_by,
+    )
+
+    return {
+        "top_k": body.top_k,
+        "results": [
+            {"query": query, "results": query_hits}
+            for query, query_hits in zip(body.queries, hits)
+        ],
+    }
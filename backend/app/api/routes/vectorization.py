@@ -3,18 +3,25 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.core.db import get_db
-from app.services.vectorization_service import vectorize_all_documents
+from app.jobs.handlers import JOB_VECTORIZE
+from app.jobs.runner import get_job_runner
 
 router = APIRouter(prefix="/vectorization", tags=["vectorization"])
 
 
-@router.post("/vectorize-all")
+@router.post("/vectorize-all", status_code=202)
 def vectorize_all_docs_endpoint(
     limit: int | None = None,
+    force: bool = False,
+    embedding_workers: int | None = None,
     db: Session = Depends(get_db),
 ):
-    total_chunks = vectorize_all_documents(db, limit=limit)
+    job = get_job_runner().submit(
+        db,
+        JOB_VECTORIZE,
+        {"limit": limit, "force": force, "embedding_workers": embedding_workers},
+    )
     return {
-        "status": "ok",
-        "indexed_passages": total_chunks,
+        "status": job.status,
+        "job_id": job.id,
     }
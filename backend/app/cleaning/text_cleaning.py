@@ -1,64 +1,98 @@
 import re
-from collections import Counter
-from typing import List
+from collections import Counter, deque
+from typing import Deque, List, TextIO
 
 HEADER_FOOTER_MIN_REPEAT = 3  
 HEADER_MIN_LEN = 25           
+HEADER_WINDOW_PAGES = 8
+
+# bump when the cleaning output changes so stored clean_text gets rebuilt
+CLEANER_VERSION = "1"
+STREAMING_CLEANER_VERSION = f"{CLEANER_VERSION}-stream"
+CURRENT_CLEANER_VERSIONS = (CLEANER_VERSION, STREAMING_CLEANER_VERSION)
 
 
 def _normalize_newlines(text: str) -> str:
     return text.replace("\r\n", "\n").replace("\r", "\n")
 
 
+_CID_RE = re.compile(r"\(cid:[0-9]+\)")
+# same result as [ \t]+ -> " ", without rewriting every single space
+_HSPACE_RE = re.compile(r"[ \t]{2,}|\t")
+_WS_RUN_RE = re.compile(r"\s{2,}")
+_DIGITS_OR_SYMBOLS_RE = re.compile(r"[0-9\W]+")
+_SPACED_LETTERS_RE = re.compile(r"([A-Za-z]\s+){1,}[A-Za-z]")
+_SENTENCE_PUNCT_RE = re.compile(r"[\.!?]")
+
+_MATH_SYMBOLS = "=+-−*/<>≤≥∑∏∫()[]{}_^%|,:;"
+_DROP_MATH_SYMBOLS = str.maketrans("", "", _MATH_SYMBOLS)
+
+
 def _remove_pdf_artifacts(text: str) -> str:
 
     text = text.replace("\x00", " ")
 
-    text = re.sub(r"\(cid:[0-9]+\)", " ", text)
+    text = _CID_RE.sub(" ", text)
 
     text = text.replace("ˆ", "")
 
-    text = re.sub(r"[ \t]+", " ", text)
+    text = _HSPACE_RE.sub(" ", text)
 
     return text
 
 
-def _remove_obvious_noise_lines(lines: List[str]) -> List[str]:
-    cleaned = []
-    for line in lines:
-        s = line.strip()
-        if not s:
-            cleaned.append("")
-            continue
+def _is_noise_line(s: str) -> bool:
+    # every rule below is an independent "drop" condition, so they are ordered
+    # cheapest first; per-character counts use C-level map/translate, not Python loops.
+    n = len(s)
 
-        if len(s) <= 3 and re.fullmatch(r"[0-9\W]+", s):
-            continue
+    if n <= 3 and _DIGITS_OR_SYMBOLS_RE.fullmatch(s):
+        return True
 
-        if len(s) <= 2 and s.isalpha():
-            continue
+    if n <= 2 and s.isalpha():
+        return True
 
-        letters = sum(ch.isalpha() for ch in s)
+    letters = sum(map(str.isalpha, s))
 
-        if re.fullmatch(r"([A-Za-z]\s+){1,}[A-Za-z]", s):
-            continue
+    if s.count(" ") > letters and letters < 10:
+        return True
 
-        if s.count(" ") > letters and letters < 10:
-            continue
+    if letters / n < 0.25 and n < 40:
+        return True
 
-        if letters / max(len(s), 1) < 0.25 and len(s) < 40:
-            continue
+    if _SPACED_LETTERS_RE.fullmatch(s):
+        return True
 
-        chunks = re.split(r"\s{2,}", s)
-        if len(chunks) >= 3 and not re.search(r"[\.!?;:]", s):
-            continue
+    has_sentence_punct = _SENTENCE_PUNCT_RE.search(s) is not None
+
+    if (
+        not has_sentence_punct
+        and ";" not in s
+        and ":" not in s
+        and len(_WS_RUN_RE.findall(s)) >= 2
+    ):
+        return True
 
-        math_symbols = "=+-−*/<>≤≥∑∏∫()[]{}_^%|,:;"
-        math_like = sum(ch.isdigit() or ch in math_symbols for ch in s)
+    if has_sentence_punct:
+        return False
 
-        if len(s) < 15 and math_like > 0 and not re.search(r"[\.!?]", s):
+    math_like = sum(map(str.isdigit, s)) + n - len(s.translate(_DROP_MATH_SYMBOLS))
+
+    if math_like > 0 and (n < 15 or math_like / n > 0.4):
+        return True
+
+    return False
+
+
+def _remove_obvious_noise_lines(lines: List[str]) -> List[str]:
+    cleaned = []
+    for line in lines:
+        s = line.strip()
+        if not s:
+            cleaned.append("")
             continue
 
-        if math_like > 0 and math_like / len(s) > 0.4 and not re.search(r"[\.!?]", s):
+        if _is_noise_line(s):
             continue
 
         cleaned.append(s)
@@ -118,7 +152,8 @@ def _merge_lines_into_paragraphs(lines: List[str]) -> str:
             buffer.append(s)
 
     flush_buffer()
-    paragraphs = [re.sub(r"\s+", " ", p).strip() for p in paragraphs if p.strip()]
+    # " ".join(p.split()) == re.sub(r"\s+", " ", p).strip(), both split on str.isspace
+    paragraphs = [" ".join(p.split()) for p in paragraphs if p.strip()]
 
     return "\n\n".join(paragraphs)
 
@@ -141,3 +176,65 @@ def clean_raw_text(raw_text: str) -> str:
     cleaned = _merge_lines_into_paragraphs(lines)
 
     return cleaned.strip()
+
+
+
+class StreamingCleaner:
+    # page-at-a-time variant of clean_raw_text. Headers are detected over the last
+    # HEADER_WINDOW_PAGES pages: an upper-case line already seen in the window is
+    # dropped, so only its first occurrence survives.
+
+    def __init__(self, out: TextIO, window_pages: int = HEADER_WINDOW_PAGES):
+        self.out = out
+        self._window: Deque[List[str]] = deque()
+        self._window_pages = window_pages
+        self._seen: Counter = Counter()
+        self._buffer: List[str] = []
+        self._written = False
+
+    def feed_page(self, page_text: str) -> None:
+        text = _remove_pdf_artifacts(_normalize_newlines(page_text))
+        lines = _remove_obvious_noise_lines(text.split("\n"))
+
+        page_headers: List[str] = []
+        for s in lines:
+            if not s:
+                self._flush_paragraph()
+                continue
+
+            if len(s) >= HEADER_MIN_LEN and s.upper() == s:
+                page_headers.append(s)
+                if self._seen[s]:
+                    continue
+
+            self._add_line(s)
+
+        self._window.append(page_headers)
+        self._seen.update(page_headers)
+        if len(self._window) > self._window_pages:
+            self._seen.subtract(self._window.popleft())
+            self._seen += Counter()
+
+    def close(self) -> None:
+        self._flush_paragraph()
+
+    def _add_line(self, s: str) -> None:
+        if self._buffer:
+            prev = self._buffer[-1]
+            if prev.endswith("-") and not prev.endswith("--"):
+                self._buffer[-1] = prev[:-1] + s
+                return
+        self._buffer.append(s)
+
+    def _flush_paragraph(self) -> None:
+        if not self._buffer:
+            return
+        paragraph = " ".join(" ".join(self._buffer).split())
+        self._buffer.clear()
+        if not paragraph:
+            return
+
+        if self._written:
+            self.out.write("\n\n")
+        self.out.write(paragraph)
+        self._written = True
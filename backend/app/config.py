@@ -6,6 +6,106 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str | None = None
+    # one client per process, shared by every VectorStore
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_POOL_SIZE: int = 16
+    QDRANT_TIMEOUT_S: int = 30
+    # passage collection layout, applied to an existing collection at startup
+    # (Qdrant rebuilds in the background). Measure with `python -m scripts.bench_vector_search`
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    # search-time ef; None = Qdrant's default
+    QDRANT_HNSW_EF: int | None = None
+    QDRANT_ON_DISK_VECTORS: bool = False
+    # "none", "scalar" (int8, 4x smaller) or "binary" (32x smaller, needs rescoring
+    # and oversampling to keep recall at 384 dims)
+    QDRANT_QUANTIZATION: str = "none"
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True
+    QDRANT_QUANTIZATION_RESCORE: bool = True
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = 2.0
+
+    
+    # "torch" or "onnx"; check drift with `python -m scripts.check_embedding_drift`
+    EMBEDDING_BACKEND: str = "torch"
+    EMBEDDING_ONNX_QUANTIZE: bool = True
+    EMBEDDING_ONNX_QUANT_CONFIG: str = "avx2"
+    EMBEDDING_ONNX_DIR: str = "data/onnx_models"
+    EMBEDDING_BATCH_SIZE: int = 64
+    # >1 starts that many embedding processes (one model each) for reindex runs
+    EMBEDDING_WORKERS: int = 0
+    # threads that embed queries for the async retrieval path (bounds concurrent encodes)
+    EMBEDDING_QUERY_WORKERS: int = 2
+    CHUNK_MAX_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 32
+    INDEX_BATCH_SIZE: int = 256
+    INDEX_QUEUE_SIZE: int = 4
+    INDEX_UPSERT_WORKERS: int = 4
+    # chunks this similar (cosine) to an already indexed chunk are stored as a
+    # ref on that point instead of a point of their own
+    INDEX_DEDUP_ENABLED: bool = True
+    INDEX_DEDUP_SIMILARITY: float = 0.97
+
+    
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 50000
+    # about 1 KB per row at 384 dims; None = unbounded
+    EMBEDDING_CACHE_MAX_ROWS: int | None = 1_000_000
+
+    
+    PDF_DOWNLOAD_CONCURRENCY: int = 8
+    PDF_DOWNLOAD_TIMEOUT_S: float = 20.0
+    # "pdfminer" or "pdfium" (needs pypdfium2); compare with `python -m scripts.bench_pdf_backends`
+    PDF_BACKEND: str = "pdfminer"
+    PDF_EXTRACT_WORKERS: int | None = None
+    PDF_EXTRACT_TIMEOUT_S: float = 120.0
+    PDF_EXTRACT_MAX_RSS_MB: int | None = 1536
+    PDF_EXTRACT_STREAMING: bool = False
+
+    
+    PDF_CACHE_MODE: str = "read_write"
+    PDF_CACHE_DIR: str = "data/pdf_cache"
+    PDF_CACHE_MAX_MB: int = 20480
+    PDF_CACHE_TEXT: bool = True
+
+    
+    CLEAN_WORKERS: int | None = None
+    CLEAN_BATCH_SIZE: int = 200
+    EXTRACTION_BATCH_SIZE: int = 32
+    INGEST_QUEUE_SIZE: int = 512
+    # push documents saved by the collector straight through the pipeline
+    INGEST_ON_COLLECT: bool = True
+    # how long a collector/harvester submit waits on a full queue; what doesn't
+    # fit stays unindexed for the next backfill (POST /ingestion/run)
+    INGEST_SUBMIT_TIMEOUT_S: float = 1.0
+    DEDUP_ENABLED: bool = True
+    DEDUP_MINHASH_THRESHOLD: float = 0.7
+
+    
+    JOBS_MAX_CONCURRENT: int = 2
+    JOBS_PROGRESS_INTERVAL_S: float = 2.0
+    # each runner stamps its active jobs this often; another runner takes over
+    # (interrupts running / requeues queued) jobs not stamped for OWNER_TIMEOUT
+    JOBS_HEARTBEAT_S: float = 10.0
+    JOBS_OWNER_TIMEOUT_S: float = 60.0
+
+    
+    ARXIV_API_URL: str = "https://export.arxiv.org/api/query"
+    ARXIV_QUERY: str = (
+        "(cat:cs.AI OR cat:cs.CL OR cat:cs.LG OR cat:cs.CV OR cat:cs.IR OR cat:cs.NE"
+        " OR cat:stat.ML OR cat:eess.IV OR cat:eess.AS)"
+        ' AND (all:llm OR all:transformer OR all:"large language model"'
+        ' OR all:"retrieval augmented generation" OR all:"knowledge graph"'
+        ' OR all:"multi-agent" OR all:"self-supervised" OR all:"representation learning"'
+        ' OR all:reasoning OR all:"few-shot" OR all:"prompt learning")'
+    )
+    ARXIV_PAGE_SIZE: int = 200
+    ARXIV_CONCURRENCY: int = 2
+    # arXiv asks for at most one request every 3 seconds
+    ARXIV_REQUEST_INTERVAL_S: float = 3.0
+    ARXIV_TIMEOUT_S: float = 60.0
+    ARXIV_MAX_RETRIES: int = 3
 
     
     GEMINI_API_KEY: str | None = None
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+CACHE_MODE_OFF = "off"
+CACHE_MODE_READ_WRITE = "read_write"
+CACHE_MODE_CACHE_ONLY = "cache_only"
+
+_EVICT_TARGET_RATIO = 0.9
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PdfCache:
+
+    def __init__(self, root: str, max_bytes: int, mode: str = CACHE_MODE_READ_WRITE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._evicting = False
+
+        for sub in ("blobs", "urls", "text"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+        self._size = sum(size for _, _, size in self._entries())
+
+    @property
+    def cache_only(self) -> bool:
+        return self.mode == CACHE_MODE_CACHE_ONLY
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, "blobs", content_hash[:2], f"{content_hash}.pdf")
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.root, "urls", _sha256(url.encode("utf-8")))
+
+    def _text_path(self, content_hash: str, extractor: str) -> str:
+        return os.path.join(self.root, "text", content_hash[:2], f"{content_hash}.{extractor}.txt")
+
+    def content_hash_for_url(self, url: str) -> Optional[str]:
+        data = self._read(self._url_path(url))
+        if data is None:
+            return None
+        return data.decode("utf-8").strip() or None
+
+    def get_pdf(self, url: str) -> Tuple[Optional[str], Optional[bytes]]:
+        content_hash = self.content_hash_for_url(url)
+        if not content_hash:
+            return None, None
+
+        data = self._read(self._blob_path(content_hash))
+        if data is None:
+            return None, None
+        return content_hash, data
+
+    def put_pdf(self, url: str, data: bytes) -> str:
+        content_hash = _sha256(data)
+        path = self._blob_path(content_hash)
+        if not os.path.exists(path):
+            self._write(path, data)
+        self._write(self._url_path(url), content_hash.encode("utf-8"))
+        return content_hash
+
+    def get_text(self, content_hash: str, extractor: str) -> Optional[str]:
+        data = self._read(self._text_path(content_hash, extractor))
+        return data.decode("utf-8") if data is not None else None
+
+    def put_text(self, content_hash: str, extractor: str, text: str) -> None:
+        self._write(self._text_path(content_hash, extractor), text.encode("utf-8"))
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        with self._lock:
+            self._size += len(data) - replaced
+            over = self._size > self.max_bytes and not self._evicting
+        if over:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for sub in ("blobs", "urls", "text"):
+            for dirpath, _, filenames in os.walk(os.path.join(self.root, sub)):
+                for name in filenames:
+                    if name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, path, st.st_size))
+        return entries
+
+    # least recently used first; reads refresh mtime. The url -> hash files
+    # are entries like any other: a dangling one is just a cache miss. The
+    # tree is walked without the lock; one eviction runs at a time.
+    def evict(self) -> int:
+        with self._lock:
+            if self._evicting:
+                return 0
+            self._evicting = True
+
+        removed = 0
+        freed = 0
+        try:
+            entries = sorted(self._entries())
+            size = sum(s for _, _, s in entries)
+            target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+
+            for _, path, entry_size in entries:
+                if size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                freed += entry_size
+                removed += 1
+        finally:
+            with self._lock:
+                self._evicting = False
+                self._size = max(0, self._size - freed)
+        return removed
+
+
+_cache_singleton: Optional[PdfCache] = None
+
+
+def get_pdf_cache() -> Optional[PdfCache]:
+    global _cache_singleton
+    if settings.PDF_CACHE_MODE == CACHE_MODE_OFF:
+        return None
+    if _cache_singleton is None:
+        _cache_singleton = PdfCache(
+            root=settings.PDF_CACHE_DIR,
+            max_bytes=settings.PDF_CACHE_MAX_MB * 1024 * 1024,
+            mode=settings.PDF_CACHE_MODE,
+        )
+    return _cache_singleton
@@ -1,10 +1,24 @@
 import io
-import requests
-from pdfminer.high_level import extract_text
+from typing import Callable, Dict, Iterator, List, TextIO
 
-def download_pdf(pdf_url: str) -> bytes | None:
+import httpx
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+try:
+    import pypdfium2 as pdfium
+except Exception:
+    pdfium = None
+
+from app.cleaning.text_cleaning import StreamingCleaner
+from app.config import settings
+
+
+async def download_pdf_async(client: httpx.AsyncClient, pdf_url: str) -> bytes | None:
     try:
-        response = requests.get(pdf_url, timeout=20)
+        response = await client.get(pdf_url)
         if response.status_code != 200:
             return None
         return response.content
@@ -12,23 +26,133 @@ def download_pdf(pdf_url: str) -> bytes | None:
         return None
 
 
-def extract_pdf_text(pdf_bytes: bytes) -> str | None:
+def extract_pdf_text_or_raise(pdf_bytes: bytes, backend: str | None = None) -> str | None:
+    text = "".join(iter_pdf_pages(pdf_bytes, backend))
+    if not text:
+        return None
+
+    cleaned = text.strip()
+    return cleaned or None
+
+
+# Backends yield one string per page in pdfminer's layout: lines end with "\n",
+# text blocks are separated by a blank line and each page ends with "\f".
+# clean_raw_text relies on the blank lines to find paragraphs.
+
+def _pdfminer_pages(pdf_bytes: bytes) -> Iterator[str]:
+    # same converter and layout params as pdfminer.high_level.extract_text,
+    # drained after every page
+    rsrcmgr = PDFResourceManager(caching=True)
+    page_out = io.StringIO()
+    device = TextConverter(rsrcmgr, page_out, laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+
     try:
-        buffer = io.BytesIO(pdf_bytes)
-        text = extract_text(buffer)
-        if not text:
-            return None
+        for page in PDFPage.get_pages(io.BytesIO(pdf_bytes), caching=True):
+            interpreter.process_page(page)
+            text = page_out.getvalue()
+            page_out.seek(0)
+            page_out.truncate(0)
+            yield text.replace("\x00", "")
+    finally:
+        device.close()
 
-        cleaned = text.replace("\x00", "").strip()
-        return cleaned or None
-    except Exception:
-        return None
 
+# pdfium marks line-break hyphens with these; pdfminer keeps a plain "-"
+_PDFIUM_HYPHENS = str.maketrans({"\x02": "-", "\ufffe": "-", "\x00": None})
+# a vertical gap wider than this many line heights starts a new block
+_PDFIUM_BLOCK_GAP = 0.7
 
 
-def extract_text_from_pdf_url(pdf_url: str) -> str | None:
-    pdf_bytes = download_pdf(pdf_url)
-    if not pdf_bytes:
-        return None
+# pdfium gives text runs with their boxes; runs that overlap vertically form a
+# line, and a wide gap or a jump back up the page (next column) ends a block.
+def _pdfium_page_text(textpage) -> str:
+    out: List[str] = []
+    line: List[str] = []
+    prev = None  # (left, bottom, right, top) of the current line
+
+    for i in range(textpage.count_rects()):
+        left, bottom, right, top = textpage.get_rect(i)
+        text = textpage.get_text_bounded(left, bottom, right, top).translate(_PDFIUM_HYPHENS)
+        text = text.replace("\r", "").replace("\n", " ")
+        if not text.strip():
+            continue
+
+        if prev is not None:
+            p_left, p_bottom, p_right, p_top = prev
+            height = max(p_top - p_bottom, 1.0)
+            overlap = min(top, p_top) - max(bottom, p_bottom)
+            if overlap > 0 and left >= p_left:
+                if left - p_right > 0.15 * height and not line[-1].endswith(" "):
+                    line.append(" ")
+                line.append(text)
+                prev = (p_left, min(bottom, p_bottom), max(right, p_right), max(top, p_top))
+                continue
+
+            out.append("".join(line).rstrip())
+            out.append("\n")
+            if p_bottom - top > _PDFIUM_BLOCK_GAP * height or top > p_top:
+                out.append("\n")
+
+        line = [text]
+        prev = (left, bottom, right, top)
+
+    if line:
+        out.append("".join(line).rstrip())
+        out.append("\n\n")
+    out.append("\f")
+    return "".join(out)
+
+
+def _pdfium_pages(pdf_bytes: bytes) -> Iterator[str]:
+    if pdfium is None:
+        raise RuntimeError("PDF_BACKEND=pdfium needs the pypdfium2 package")
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield _pdfium_page_text(textpage)
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+PDF_BACKENDS: Dict[str, Callable[[bytes], Iterator[str]]] = {
+    "pdfminer": _pdfminer_pages,
+    "pdfium": _pdfium_pages,
+}
+
+
+# also the key extracted text is cached under
+def extractor_id(backend: str | None = None) -> str:
+    name = backend or settings.PDF_BACKEND
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend {name!r}; expected one of {', '.join(PDF_BACKENDS)}")
+    return name
+
+
+def iter_pdf_pages(pdf_bytes: bytes, backend: str | None = None) -> Iterator[str]:
+    return PDF_BACKENDS[extractor_id(backend)](pdf_bytes)
+
+
+def extract_and_clean_pdf(
+    pdf_bytes: bytes,
+    raw_out: TextIO,
+    clean_out: TextIO,
+    backend: str | None = None,
+) -> int:
+    cleaner = StreamingCleaner(clean_out)
+    pages = 0
+
+    for page_text in iter_pdf_pages(pdf_bytes, backend):
+        raw_out.write(page_text)
+        cleaner.feed_page(page_text)
+        pages += 1
 
-    return extract_pdf_text(pdf_bytes)
+    cleaner.close()
+    return pages
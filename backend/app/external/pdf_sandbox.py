@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.external.pdf_extractor import extract_and_clean_pdf, extract_pdf_text_or_raise, extractor_id
+
+_POLL_S = 0.2
+
+ERROR_TIMEOUT = "timeout"
+ERROR_MEMORY = "memory_limit"
+ERROR_WORKER_DIED = "worker_died"
+ERROR_EMPTY = "empty_text"
+
+
+# streaming mode: text goes back to the parent in pieces while pages are
+# extracted, so the worker only ever holds a page or so of it
+_PIPE_CHUNK_CHARS = 64 * 1024
+
+
+class _PipeWriter:
+
+    def __init__(self, conn, kind: str):
+        self.conn = conn
+        self.kind = kind
+        self.has_text = False
+        self._parts: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> int:
+        if text:
+            self._parts.append(text)
+            self._size += len(text)
+            self.has_text = self.has_text or not text.isspace()
+            if self._size >= _PIPE_CHUNK_CHARS:
+                self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._parts:
+            self.conn.send((self.kind, "".join(self._parts)))
+            self._parts = []
+            self._size = 0
+
+
+def _extract(conn, pdf_bytes: bytes, streaming: bool, backend: str) -> Optional[Tuple[str, Optional[Dict[str, str]]]]:
+    if not streaming:
+        text = extract_pdf_text_or_raise(pdf_bytes, backend)
+        return ("ok", {"raw_text": text}) if text else None
+
+    raw_out, clean_out = _PipeWriter(conn, "raw"), _PipeWriter(conn, "clean")
+    extract_and_clean_pdf(pdf_bytes, raw_out, clean_out, backend)
+    raw_out.flush()
+    clean_out.flush()
+    # the parent assembles the text from the pieces it already has
+    return ("ok", None) if raw_out.has_text else None
+
+
+def _worker_main(conn, max_rss_mb: Optional[int], streaming: bool, backend: str) -> None:
+    if max_rss_mb:
+        try:
+            import resource
+
+            # address-space backstop; the parent enforces the RSS cap itself.
+            limit = max_rss_mb * 2 * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except Exception:
+            pass
+
+    while True:
+        try:
+            pdf_bytes = conn.recv()
+        except (EOFError, OSError):
+            return
+        if pdf_bytes is None:
+            return
+
+        try:
+            result = _extract(conn, pdf_bytes, streaming, backend)
+            if result:
+                conn.send(result)
+            else:
+                conn.send(("error", ERROR_EMPTY))
+        except MemoryError:
+            conn.send(("error", ERROR_MEMORY))
+            return
+        except Exception as exc:
+            conn.send(("error", f"{type(exc).__name__}: {exc}"[:500]))
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class _Worker:
+
+    def __init__(self, ctx, max_rss_mb: Optional[int], streaming: bool, backend: str):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, max_rss_mb, streaming, backend),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            self.kill()
+
+
+class PdfWorkerPool:
+
+    def __init__(
+        self,
+        workers: int,
+        timeout_s: float,
+        max_rss_mb: Optional[int] = None,
+        streaming: bool = False,
+        backend: str | None = None,
+    ):
+        self.timeout_s = timeout_s
+        self.max_rss_mb = max_rss_mb
+        self.streaming = streaming
+        self.backend = extractor_id(backend)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: queue.Queue = queue.Queue()
+        self.respawned = 0
+
+        for _ in range(max(1, workers)):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.max_rss_mb, self.streaming, self.backend)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.kill()
+        self.respawned += 1
+        return self._spawn()
+
+    # returns (result, error); exactly one of them is set. result always has
+    # "raw_text", and "clean_text" too when the pool runs in streaming mode.
+    def extract(self, pdf_bytes: bytes) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker = self._replace(worker)
+
+            try:
+                worker.conn.send(pdf_bytes)
+            except (BrokenPipeError, OSError):
+                worker = self._replace(worker)
+                return None, ERROR_WORKER_DIED
+
+            deadline = time.monotonic() + self.timeout_s
+            pieces: Dict[str, List[str]] = {"raw": [], "clean": []}
+            while True:
+                # limits are checked between messages too: a streaming worker
+                # may never leave the pipe empty
+                ready = worker.conn.poll(_POLL_S)
+                if not ready and not worker.alive():
+                    worker = self._replace(worker)
+                    return None, ERROR_WORKER_DIED
+                if time.monotonic() > deadline:
+                    worker = self._replace(worker)
+                    return None, ERROR_TIMEOUT
+                if self.max_rss_mb:
+                    rss = _rss_mb(worker.process.pid)
+                    if rss is not None and rss > self.max_rss_mb:
+                        worker = self._replace(worker)
+                        return None, ERROR_MEMORY
+                if not ready:
+                    continue
+
+                try:
+                    status, payload = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker = self._replace(worker)
+                    return None, ERROR_WORKER_DIED
+                if status in pieces:
+                    pieces[status].append(payload)
+                    continue
+                break
+
+            if status != "ok":
+                return None, payload
+            if payload is not None:
+                return payload, None
+
+            text = "".join(pieces["raw"]).strip()
+            if not text:
+                return None, ERROR_EMPTY
+            return {"raw_text": text, "clean_text": "".join(pieces["clean"])}, None
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
+
+    def __enter__(self) -> "PdfWorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
@@ -0,0 +1,51 @@
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from app.jobs.runner import JobContext, JobRunner
+from app.services.arxiv_harvester import harvest_arxiv
+from app.services.clean_documents import clean_documents
+from app.services.ingestion_pipeline import run_ingestion
+from app.services.text_extraction_service import process_all_documents
+from app.services.vectorization_service import vectorize_all_documents
+
+JOB_EXTRACT_TEXT = "extract_text"
+JOB_CLEAN_TEXT = "clean_text"
+JOB_VECTORIZE = "vectorize"
+JOB_INGEST = "ingest"
+JOB_HARVEST_ARXIV = "harvest_arxiv"
+
+
+# results report totals across resumes, taken from the job's progress counters
+def _extract_text(db: Session, job: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    process_all_documents(db, job=job, **params)
+    return {"processed_documents": job.progress.get("processed", 0)}
+
+
+def _clean_text(db: Session, job: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    clean_documents(db, job=job, **params)
+    return {"updated_documents": job.progress.get("processed", 0)}
+
+
+def _vectorize(db: Session, job: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    vectorize_all_documents(db, job=job, **params)
+    return {
+        "indexed_documents": job.progress.get("documents", 0),
+        "indexed_passages": job.progress.get("chunks", 0),
+    }
+
+
+def _ingest(db: Session, job: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    return run_ingestion(db, job=job, **params)
+
+
+def _harvest_arxiv(db: Session, job: JobContext, params: Dict[str, Any]) -> Dict[str, Any]:
+    return harvest_arxiv(db, job=job, **params)
+
+
+def register_handlers(runner: JobRunner) -> None:
+    runner.register(JOB_EXTRACT_TEXT, _extract_text)
+    runner.register(JOB_CLEAN_TEXT, _clean_text)
+    runner.register(JOB_VECTORIZE, _vectorize)
+    runner.register(JOB_INGEST, _ingest)
+    runner.register(JOB_HARVEST_ARXIV, _harvest_arxiv)
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.db import SessionLocal
+from app.memory.models import Job
+from app.observability.logging import get_logger
+
+log = get_logger("knowflow.jobs")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+# was running when the process stopped; can be resumed like failed/cancelled
+STATUS_INTERRUPTED = "interrupted"
+
+RESUMABLE_STATUSES = (STATUS_FAILED, STATUS_CANCELLED, STATUS_INTERRUPTED)
+FINISHED_STATUSES = (STATUS_SUCCEEDED,) + RESUMABLE_STATUSES
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# handed to the job function. progress/checkpoint go to the job row through
+# their own short sessions, so they never commit the job's own work early.
+class JobContext:
+
+    def __init__(self, job_id: str, progress: Dict[str, Any], checkpoint: Dict[str, Any]):
+        self.job_id = job_id
+        self.progress: Dict[str, Any] = dict(progress or {})
+        self.checkpoint: Dict[str, Any] = dict(checkpoint or {})
+        self._cancelled = False
+        # set by JobRunner.shutdown; unlike a cancel it ends the job as interrupted
+        self.stopped = False
+        self._last_flush = 0.0
+
+    def update(self, **counters: Any) -> None:
+        self.progress.update(counters)
+        if time.monotonic() - self._last_flush >= settings.JOBS_PROGRESS_INTERVAL_S:
+            self.flush()
+
+    def increment(self, **counters: int) -> None:
+        self.update(**{k: self.progress.get(k, 0) + v for k, v in counters.items()})
+
+    # call only once the work up to this point is committed
+    def save_checkpoint(self, **values: Any) -> None:
+        self.checkpoint.update(values)
+        self.flush()
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        with SessionLocal() as db:
+            job = db.get(Job, self.job_id)
+            if job is None:
+                return
+            job.progress = dict(self.progress)
+            job.checkpoint = dict(self.checkpoint)
+            self._cancelled = bool(job.cancel_requested)
+            db.commit()
+
+    def stop(self) -> None:
+        self.stopped = True
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled or self.stopped:
+            raise JobCancelled(self.job_id)
+
+
+JobFn = Callable[[Session, JobContext, Dict[str, Any]], Any]
+
+
+class JobRunner:
+
+    def __init__(self, max_concurrent: int):
+        # separate from the server's threadpool so bulk jobs can't starve /query
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_concurrent), thread_name_prefix="job")
+        self._handlers: Dict[str, JobFn] = {}
+        # makes the "already active?" check and the insert one step
+        self._submit_lock = threading.Lock()
+        # fresh per process, so a restarted server (same host, maybe even the
+        # same pid in a container) never takes the old process's jobs for its own
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._active: Dict[str, JobContext] = {}
+        self._active_lock = threading.Lock()
+
+    def register(self, kind: str, fn: JobFn) -> None:
+        self._handlers[kind] = fn
+
+    def submit(self, db: Session, kind: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        # jobs of one kind checkpoint and write the same rows, so at most one
+        # runs at a time; submitting again returns the active one
+        with self._submit_lock:
+            active = self.active_job(db, kind)
+            if active is not None:
+                log.info("job_already_active", job_id=active.id, kind=kind)
+                return active
+
+            job = Job(
+                id=uuid.uuid4().hex,
+                kind=kind,
+                status=STATUS_QUEUED,
+                params=params or {},
+                progress={},
+                checkpoint={},
+                cancel_requested=False,
+                owner=self.owner,
+                heartbeat_at=datetime.utcnow(),
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+
+        self._start_heartbeat()
+        self._pool.submit(self._run, job.id)
+        return job
+
+    def active_job(self, db: Session, kind: str) -> Optional[Job]:
+        return (
+            db.query(Job)
+            .filter(Job.kind == kind, Job.status.in_(ACTIVE_STATUSES))
+            .order_by(Job.created_at)
+            .first()
+        )
+
+    def cancel(self, db: Session, job: Job) -> Job:
+        if job.status not in FINISHED_STATUSES:
+            job.cancel_requested = True
+            db.commit()
+            db.refresh(job)
+        return job
+
+    def resume(self, db: Session, job: Job) -> Job:
+        if job.status not in RESUMABLE_STATUSES:
+            raise ValueError(f"Job {job.id} is {job.status}; only {', '.join(RESUMABLE_STATUSES)} jobs can be resumed")
+
+        with self._submit_lock:
+            active = self.active_job(db, job.kind)
+            if active is not None:
+                raise ValueError(f"Job {active.id} of kind {job.kind} is already {active.status}")
+
+            job.status = STATUS_QUEUED
+            job.cancel_requested = False
+            job.error = None
+            job.finished_at = None
+            job.owner = self.owner
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+            db.refresh(job)
+
+        self._start_heartbeat()
+        self._pool.submit(self._run, job.id)
+        return job
+
+    # takes over jobs whose owner is gone: running ones are marked interrupted,
+    # queued ones never started and are queued again here. Jobs of a live
+    # runner (another worker process, or the old process during a reload) are
+    # left alone; the heartbeat thread repeats this so they're picked up once
+    # that runner stops stamping them.
+    def recover(self) -> None:
+        self._start_heartbeat()
+        self._recover_orphans()
+
+    def _owner_gone(self, owner: Optional[str], heartbeat_at: Optional[datetime], cutoff: datetime) -> bool:
+        if owner == self.owner:
+            return False
+        if heartbeat_at is None or heartbeat_at < cutoff:
+            return True
+        host, _, rest = (owner or "").partition(":")
+        pid = rest.partition(":")[0]
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        # our own pid under another boot id is a previous incarnation
+        if int(pid) == os.getpid():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _recover_orphans(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.JOBS_OWNER_TIMEOUT_S)
+        interrupted = 0
+        queued: List[str] = []
+        with SessionLocal() as db:
+            candidates = (
+                db.query(Job.id, Job.status, Job.owner, Job.heartbeat_at)
+                .filter(Job.status.in_(ACTIVE_STATUSES))
+                .order_by(Job.created_at)
+                .all()
+            )
+            for job_id, status, owner, heartbeat_at in candidates:
+                if not self._owner_gone(owner, heartbeat_at, cutoff):
+                    continue
+                # only if nobody else took it over since we looked
+                claimed = (
+                    db.query(Job)
+                    .filter(
+                        Job.id == job_id,
+                        Job.status == status,
+                        Job.owner.is_(None) if owner is None else Job.owner == owner,
+                    )
+                    .update(
+                        {
+                            Job.status: STATUS_INTERRUPTED if status == STATUS_RUNNING else STATUS_QUEUED,
+                            Job.owner: self.owner,
+                            Job.heartbeat_at: datetime.utcnow(),
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if not claimed:
+                    continue
+                if status == STATUS_RUNNING:
+                    interrupted += 1
+                else:
+                    queued.append(job_id)
+
+        for job_id in queued:
+            self._pool.submit(self._run, job_id)
+
+        if interrupted or queued:
+            log.info("jobs_recovered", interrupted=interrupted, requeued=len(queued), owner=self.owner)
+
+    def _start_heartbeat(self) -> None:
+        with self._submit_lock:
+            if self._heartbeat is None and not self._stopping.is_set():
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopping.wait(settings.JOBS_HEARTBEAT_S):
+            try:
+                with SessionLocal() as db:
+                    db.query(Job).filter(Job.owner == self.owner, Job.status.in_(ACTIVE_STATUSES)).update(
+                        {Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+                    )
+                    db.commit()
+                self._recover_orphans()
+            except Exception:
+                log.exception("job_heartbeat_failed", owner=self.owner)
+
+    # running jobs stop at their next raise_if_cancelled and are left interrupted
+    # (resumable); queued ones stay queued for the next process to recover
+    def shutdown(self) -> None:
+        self._stopping.set()
+        with self._active_lock:
+            for ctx in self._active.values():
+                ctx.stop()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job_id: str, status: str, ctx: JobContext, result: Any = None, error: str | None = None) -> None:
+        with SessionLocal() as db:
+            job = db.get(Job, job_id)
+            job.status = status
+            job.progress = dict(ctx.progress)
+            job.checkpoint = dict(ctx.checkpoint)
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+
+    def _run(self, job_id: str) -> None:
+        with SessionLocal() as db:
+            job = db.get(Job, job_id)
+            # taken over by another runner since it was queued here
+            if job is None or job.status != STATUS_QUEUED or job.owner != self.owner:
+                return
+
+            ctx = JobContext(job.id, job.progress, job.checkpoint)
+            if job.cancel_requested:
+                self._finish(job_id, STATUS_CANCELLED, ctx)
+                return
+
+            with self._active_lock:
+                if self._stopping.is_set():
+                    return
+                self._active[job_id] = ctx
+
+            kind, params = job.kind, dict(job.params or {})
+            job.status = STATUS_RUNNING
+            job.started_at = datetime.utcnow()
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+        log.info("job_started", job_id=job_id, kind=kind, checkpoint=ctx.checkpoint)
+        started = time.perf_counter()
+
+        db = SessionLocal()
+        try:
+            result = self._handlers[kind](db, ctx, params)
+            db.commit()
+            self._finish(job_id, STATUS_SUCCEEDED, ctx, result=result)
+            log.info("job_succeeded", job_id=job_id, kind=kind, seconds=round(time.perf_counter() - started, 1))
+        except JobCancelled:
+            db.rollback()
+            if ctx.stopped:
+                self._finish(job_id, STATUS_INTERRUPTED, ctx)
+                log.info("job_interrupted", job_id=job_id, kind=kind, checkpoint=ctx.checkpoint)
+            else:
+                self._finish(job_id, STATUS_CANCELLED, ctx)
+                log.info("job_cancelled", job_id=job_id, kind=kind, checkpoint=ctx.checkpoint)
+        except Exception as exc:
+            db.rollback()
+            self._finish(job_id, STATUS_FAILED, ctx, error=f"{type(exc).__name__}: {exc}")
+            log.exception("job_failed", job_id=job_id, kind=kind)
+        finally:
+            db.close()
+            with self._active_lock:
+                self._active.pop(job_id, None)
+
+
+_runner_singleton: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _runner_singleton
+    with _runner_lock:
+        if _runner_singleton is None:
+            from app.jobs.handlers import register_handlers
+
+            _runner_singleton = JobRunner(settings.JOBS_MAX_CONCURRENT)
+            register_handlers(_runner_singleton)
+    return _runner_singleton
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress,
+        "checkpoint": job.checkpoint,
+        "result": job.result,
+        "error": job.error,
+        "cancel_requested": job.cancel_requested,
+        "owner": job.owner,
+        "heartbeat_at": job.heartbeat_at,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -11,6 +11,12 @@ from .api.routes.intent import router as intent_router
 from .api.routes.summarizer import router as summarizer_router
 from .api.routes.graph import router as graph_router
 from .api.routes.adaptation import router as adaptation_router
+from .api.routes.jobs import router as jobs_router
+from .api.routes.ingestion import router as ingestion_router
+from .api.routes.harvester import router as harvester_router
+from .jobs.runner import get_job_runner
+from .memory.vector_store import close_async_qdrant_client, close_qdrant_client, init_vector_store
+from .services.ingestion_pipeline import shutdown_ingestion_pipeline
 
 from app.observability.logging import configure_logging
 from app.observability.middleware import ObservabilityMiddleware
@@ -48,4 +54,29 @@ app.include_router(query_router.router, prefix="/api")
 app.include_router(intent_router, prefix="/api")
 app.include_router(summarizer_router, prefix="/api")
 app.include_router(graph_router, prefix="/api")
-app.include_router(adaptation_router, prefix="/api")
\ No newline at end of file
+app.include_router(adaptation_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
+app.include_router(ingestion_router, prefix="/api")
+app.include_router(harvester_router, prefix="/api")
+
+
+@app.on_event("startup")
+def start_job_runner():
+    get_job_runner().recover()
+
+
+@app.on_event("startup")
+def open_vector_store():
+    init_vector_store()
+
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    get_job_runner().shutdown()
+    shutdown_ingestion_pipeline()
+    close_qdrant_client()
+
+
+@app.on_event("shutdown")
+async def close_async_vector_store():
+    await close_async_qdrant_client()
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.memory.models import Document, DocumentBand
+
+DEDUP_NEW = "new"
+DEDUP_DUPLICATE = "duplicate"
+DEDUP_NEWER_VERSION = "newer_version"
+
+# 32 bands x 4 rows: pairs above ~0.6 Jaccard almost always share a bucket;
+# candidates are then checked against DEDUP_MINHASH_THRESHOLD
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+
+# titles shorter than this ("Introduction", "Editorial") are too generic to match on
+_MIN_TITLE_CHARS = 20
+# same normalized title: abstracts only need to agree loosely (rewrites between versions)
+_TITLE_MATCH_SIMILARITY = 0.5
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(20240611)
+# kept below 2**32 so a * hash + b cannot overflow uint64
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+_ARXIV_RE = re.compile(
+    r"arxiv\.org/(?:abs|pdf)/(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v(\d+))?",
+    re.IGNORECASE,
+)
+
+
+def normalize_title(title: str | None) -> str:
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(_NON_ALNUM_RE.sub(" ", text.lower()).split())
+
+
+def parse_arxiv_id(*urls: str | None) -> Tuple[Optional[str], Optional[int]]:
+    for url in urls:
+        m = _ARXIV_RE.search(url or "")
+        if m:
+            return m.group(1).lower(), int(m.group(2)) if m.group(2) else None
+    return None, None
+
+
+def minhash(text: str | None) -> Optional[np.ndarray]:
+    words = normalize_title(text).split()
+    if not words:
+        return None
+
+    n = min(SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    permuted = ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE) & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+# one signed 64-bit bucket per band; the band number is part of the hash
+def band_buckets(sig: np.ndarray) -> List[int]:
+    buckets = []
+    for band in range(BANDS):
+        h = hashlib.blake2b(digest_size=8)
+        h.update(band.to_bytes(2, "little"))
+        h.update(sig[band * ROWS:(band + 1) * ROWS].tobytes())
+        buckets.append(int.from_bytes(h.digest(), "little", signed=True))
+    return buckets
+
+
+def document_signature(
+    title: str | None,
+    abstract: str | None,
+    url: str | None,
+    pdf_url: str | None,
+) -> Dict:
+    arxiv_id, arxiv_version = parse_arxiv_id(url, pdf_url)
+    sig = minhash(abstract)
+    return {
+        "norm_title": normalize_title(title) or None,
+        "arxiv_id": arxiv_id,
+        "arxiv_version": arxiv_version,
+        "minhash": sig.tobytes() if sig is not None else None,
+    }
+
+
+def _sig_array(row: Dict) -> Optional[np.ndarray]:
+    raw = row.get("minhash")
+    return np.frombuffer(raw, dtype=np.uint32) if raw else None
+
+
+class DedupIndex:
+    # in-memory view of the candidates for one batch. keys are document ids for
+    # rows already in the database, or anything hashable for rows of the batch.
+
+    def __init__(self):
+        self._rows: Dict[Hashable, Dict] = {}
+        self._sigs: Dict[Hashable, Optional[np.ndarray]] = {}
+        self._by_arxiv: Dict[str, Hashable] = {}
+        self._by_title: Dict[str, List[Hashable]] = {}
+        self._by_bucket: Dict[int, List[Hashable]] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._rows
+
+    def add(self, key: Hashable, row: Dict) -> None:
+        self._rows[key] = row
+        sig = _sig_array(row)
+        self._sigs[key] = sig
+
+        if row.get("arxiv_id"):
+            self._by_arxiv.setdefault(row["arxiv_id"], key)
+        if row.get("norm_title"):
+            self._by_title.setdefault(row["norm_title"], []).append(key)
+        if sig is not None:
+            for bucket in band_buckets(sig):
+                self._by_bucket.setdefault(bucket, []).append(key)
+
+    def match(self, row: Dict) -> Tuple[str, Optional[Hashable]]:
+        arxiv_id = row.get("arxiv_id")
+        if arxiv_id and arxiv_id in self._by_arxiv:
+            key = self._by_arxiv[arxiv_id]
+            known = self._rows[key].get("arxiv_version")
+            incoming = row.get("arxiv_version")
+            if known is not None and incoming is not None and incoming > known:
+                return DEDUP_NEWER_VERSION, key
+            return DEDUP_DUPLICATE, key
+
+        sig = _sig_array(row)
+
+        title = row.get("norm_title")
+        if title and len(title) >= _MIN_TITLE_CHARS:
+            for key in self._by_title.get(title, []):
+                other = self._sigs[key]
+                if self._different_papers(row, key):
+                    continue
+                if sig is None or other is None or similarity(sig, other) >= _TITLE_MATCH_SIMILARITY:
+                    return DEDUP_DUPLICATE, key
+
+        if sig is not None:
+            seen = set()
+            for bucket in band_buckets(sig):
+                for key in self._by_bucket.get(bucket, []):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if self._different_papers(row, key):
+                        continue
+                    if similarity(sig, self._sigs[key]) >= settings.DEDUP_MINHASH_THRESHOLD:
+                        return DEDUP_DUPLICATE, key
+
+        return DEDUP_NEW, None
+
+    def _different_papers(self, row: Dict, key: Hashable) -> bool:
+        other = self._rows[key].get("arxiv_id")
+        return bool(row.get("arxiv_id") and other and row["arxiv_id"] != other)
+
+
+_CANDIDATE_COLUMNS = (
+    Document.id,
+    Document.norm_title,
+    Document.arxiv_id,
+    Document.arxiv_version,
+    Document.minhash,
+)
+
+
+# one query per key type for the whole batch
+def load_candidates(db: Session, rows: Iterable[Dict]) -> DedupIndex:
+    rows = list(rows)
+    arxiv_ids = {r["arxiv_id"] for r in rows if r.get("arxiv_id")}
+    titles = {r["norm_title"] for r in rows if r.get("norm_title")}
+    buckets = set()
+    for r in rows:
+        sig = _sig_array(r)
+        if sig is not None:
+            buckets.update(band_buckets(sig))
+
+    index = DedupIndex()
+    candidate_ids = set()
+    if buckets:
+        candidate_ids.update(
+            doc_id
+            for (doc_id,) in db.query(DocumentBand.doc_id).filter(DocumentBand.bucket.in_(buckets)).distinct()
+        )
+
+    filters = []
+    if arxiv_ids:
+        filters.append(Document.arxiv_id.in_(arxiv_ids))
+    if titles:
+        filters.append(Document.norm_title.in_(titles))
+    if candidate_ids:
+        filters.append(Document.id.in_(candidate_ids))
+
+    for f in filters:
+        for doc_id, norm_title, arxiv_id, arxiv_version, sig in db.query(*_CANDIDATE_COLUMNS).filter(f):
+            if doc_id in index:
+                continue
+            index.add(
+                doc_id,
+                {
+                    "norm_title": norm_title,
+                    "arxiv_id": arxiv_id,
+                    "arxiv_version": arxiv_version,
+                    "minhash": sig,
+                },
+            )
+    return index
+
+
+def write_bands(db: Session, doc_ids_and_rows: Iterable[Tuple[int, Dict]], replace: bool = False) -> None:
+    values = []
+    doc_ids = []
+    for doc_id, row in doc_ids_and_rows:
+        doc_ids.append(doc_id)
+        sig = _sig_array(row)
+        if sig is not None:
+            values.extend({"bucket": b, "doc_id": doc_id} for b in band_buckets(sig))
+
+    if replace and doc_ids:
+        db.execute(delete(DocumentBand).where(DocumentBand.doc_id.in_(doc_ids)))
+    if values:
+        db.execute(pg_insert(DocumentBand).values(values).on_conflict_do_nothing())
@@ -1,26 +1,224 @@
-from sqlalchemy.orm import Session
-from .models import Document
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Query, Session
+from .dedup import DEDUP_NEW, DEDUP_NEWER_VERSION, document_signature, load_candidates, write_bands
+from .models import Document, STAGE_EXTRACTED, STAGE_NEW
+from ..cleaning.text_cleaning import CURRENT_CLEANER_VERSIONS
+from ..config import settings
 from ..schemas.collect import CollectItem
 
+DEFAULT_STREAM_BATCH_SIZE = 200
+
+
 def save_metadata(db: Session, item: CollectItem) -> int:
-    if item.url:
-        existing = db.query(Document).filter(Document.url == str(item.url)).first()
-        if existing:
-            return existing.id
-
-    doc = Document(
-        source=item.source,
-        content_type=item.content_type.value,
-        title=item.title,
-        abstract=item.abstract,
-        url=str(item.url) if item.url else None,
-        pdf_url=str(item.pdf_url) if item.pdf_url else None,
-        authors=item.authors or [],
-        year=item.year,
-        raw_text=item.raw_text,
+    return save_metadata_batch(db, [item])[0]["doc_id"]
+
+
+def _document_row(item: CollectItem, now: datetime) -> Dict:
+    url = str(item.url) if item.url else None
+    pdf_url = str(item.pdf_url) if item.pdf_url else None
+    return {
+        "source": item.source,
+        "content_type": item.content_type.value,
+        "title": item.title,
+        "abstract": item.abstract,
+        "url": url,
+        "pdf_url": pdf_url,
+        "authors": item.authors or [],
+        "year": item.year,
+        "raw_text": item.raw_text,
+        "stage": STAGE_EXTRACTED if item.raw_text else STAGE_NEW,
+        "created_at": now,
+        **document_signature(item.title, item.abstract, url, pdf_url),
+    }
+
+
+# a newer version takes over the existing row; its text is re-extracted and the
+# index manifest is kept so the old version's passages are replaced, not duplicated
+def _replace_document(db: Session, doc_id: int, row: Dict) -> None:
+    values = {k: v for k, v in row.items() if k != "created_at"}
+    values.update(
+        clean_text=None,
+        clean_version=None,
+        extraction_error=None,
+        extraction_failed_at=None,
     )
+    db.query(Document).filter(Document.id == doc_id).update(values, synchronize_session=False)
+
+
+# decides new / duplicate / newer version for every row. Returns the indices to
+# insert and, for rows that duplicate another row of the same batch, that row's index.
+def _deduplicate(db: Session, rows: List[Dict], results: List[Dict | None]) -> Tuple[List[int], Dict[int, int]]:
+    urls = [row["url"] for row in rows if row["url"] is not None]
+    known_urls: Dict[str, int] = {}
+    if urls:
+        known_urls = {
+            url: doc_id
+            for doc_id, url in db.execute(select(Document.id, Document.url).where(Document.url.in_(urls)))
+        }
+
+    index = load_candidates(db, [row for row in rows if row["url"] not in known_urls])
+    pending: List[int] = []
+    same_batch: Dict[int, int] = {}
+    replaced: List[Tuple[int, Dict]] = []
+
+    for i, row in enumerate(rows):
+        if row["url"] in known_urls:
+            results[i] = {"doc_id": known_urls[row["url"]], "status": "existing"}
+            continue
 
-    db.add(doc)
+        status, key = index.match(row)
+        if status == DEDUP_NEW:
+            index.add(("batch", i), row)
+            pending.append(i)
+            continue
+
+        if status == DEDUP_NEWER_VERSION:
+            index.add(key, row)
+            if isinstance(key, tuple):
+                rows[key[1]] = row
+            else:
+                _replace_document(db, key, row)
+                replaced.append((key, row))
+                results[i] = {"doc_id": key, "status": "replaced"}
+                continue
+
+        if isinstance(key, tuple):
+            same_batch[i] = key[1]
+        else:
+            results[i] = {"doc_id": key, "status": "duplicate"}
+
+    write_bands(db, replaced, replace=True)
+    return pending, same_batch
+
+
+def save_metadata_batch(db: Session, items: List[CollectItem]) -> List[Dict]:
+    now = datetime.utcnow()
+    rows = [_document_row(item, now) for item in items]
+    results: List[Dict | None] = [None] * len(rows)
+
+    pending = list(range(len(rows)))
+    same_batch: Dict[int, int] = {}
+    if settings.DEDUP_ENABLED:
+        pending, same_batch = _deduplicate(db, rows, results)
+
+    inserted = _insert_rows(db, [rows[i] for i in pending])
+    for i, result in zip(pending, inserted):
+        results[i] = result
+    for i, j in same_batch.items():
+        results[i] = {"doc_id": results[j]["doc_id"], "status": "duplicate"}
+
+    write_bands(
+        db,
+        [(results[i]["doc_id"], rows[i]) for i in pending if results[i]["status"] == "created"],
+    )
     db.commit()
-    db.refresh(doc)
-    return doc.id
+    return results
+
+
+def _insert_rows(db: Session, rows: List[Dict]) -> List[Dict]:
+    by_url: Dict[str, Dict] = {}
+    for row in rows:
+        if row["url"] is not None:
+            by_url.setdefault(row["url"], row)
+
+    url_ids: Dict[str, int] = {}
+    created_urls = set()
+
+    if by_url:
+        stmt = (
+            pg_insert(Document)
+            .values(list(by_url.values()))
+            .on_conflict_do_nothing(index_elements=[Document.url])
+            .returning(Document.id, Document.url)
+        )
+        for doc_id, url in db.execute(stmt):
+            url_ids[url] = doc_id
+            created_urls.add(url)
+
+        missing = [url for url in by_url if url not in url_ids]
+        if missing:
+            existing = db.execute(
+                select(Document.id, Document.url).where(Document.url.in_(missing))
+            )
+            for doc_id, url in existing:
+                url_ids[url] = doc_id
+
+    no_url_rows = [row for row in rows if row["url"] is None]
+    no_url_ids: List[int] = []
+    if no_url_rows:
+        result = db.execute(
+            insert(Document).returning(Document.id, sort_by_parameter_order=True),
+            no_url_rows,
+        )
+        no_url_ids = list(result.scalars())
+
+    results: List[Dict] = []
+    seen_urls = set()
+    no_url_iter = iter(no_url_ids)
+    for row in rows:
+        url = row["url"]
+        if url is None:
+            results.append({"doc_id": next(no_url_iter), "status": "created"})
+            continue
+
+        created = url in created_urls and url not in seen_urls
+        seen_urls.add(url)
+        results.append({"doc_id": url_ids.get(url), "status": "created" if created else "existing"})
+
+    return results
+
+
+# SQL predicates for the work a document still needs
+def needs_extraction():
+    return and_(
+        Document.raw_text.is_(None),
+        Document.pdf_url.isnot(None),
+        Document.extraction_failed_at.is_(None),
+    )
+
+
+def needs_cleaning():
+    return and_(
+        Document.raw_text.isnot(None),
+        or_(
+            Document.clean_version.is_(None),
+            Document.clean_version.notin_(CURRENT_CLEANER_VERSIONS),
+        ),
+    )
+
+
+def iter_document_batches(
+    db: Session,
+    query: Query,
+    batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+    limit: int | None = None,
+    after_id: int = 0,
+) -> Iterator[List[Document]]:
+    # keyset pagination on the primary key: every page is a short, bounded query,
+    # and the session is committed and emptied before the next page is loaded.
+    last_id = after_id
+    remaining = limit
+
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        batch = (
+            query.filter(Document.id > last_id)
+            .order_by(Document.id)
+            .limit(size)
+            .all()
+        )
+        if not batch:
+            return
+
+        last_id = batch[-1].id
+        if remaining is not None:
+            remaining -= len(batch)
+
+        yield batch
+
+        db.commit()
+        db.expunge_all()
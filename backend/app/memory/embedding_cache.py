@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+_SQLITE_MAX_VARS = 900
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+# rows beyond max_rows are pruned oldest-written first (rowid order, and a
+# replaced row gets a new rowid), down to this share of max_rows
+_PRUNE_TARGET_RATIO = 0.9
+
+
+class EmbeddingCache:
+
+    def __init__(self, path: str, memory_items: int = 50_000, max_rows: int | None = None):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # guards the LRU and the counters only; SQLite I/O runs outside it on
+        # a connection per thread (WAL lets readers run alongside a writer)
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._local = threading.local()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._db()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        conn.commit()
+        self._rows = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(model_id: str, text: str) -> bytes:
+        h = hashlib.sha256()
+        h.update(model_id.encode("utf-8"))
+        h.update(b"\x00")
+        h.update(normalize_text(text).encode("utf-8"))
+        return h.digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+        cold: List[int] = []
+
+        with self._lock:
+            for i, k in enumerate(keys):
+                vec = self._lru.get(k)
+                if vec is not None:
+                    self._lru.move_to_end(k)
+                    found[i] = vec
+                else:
+                    cold.append(i)
+
+        loaded = []
+        for start in range(0, len(cold), _SQLITE_MAX_VARS):
+            chunk = cold[start:start + _SQLITE_MAX_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db().execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                [keys[i] for i in chunk],
+            ).fetchall()
+            stored = {bytes(k): np.frombuffer(v, dtype=np.float16) for k, v in rows}
+
+            for i in chunk:
+                vec = stored.get(keys[i])
+                if vec is not None:
+                    found[i] = vec
+                    loaded.append((keys[i], vec))
+
+        hits = sum(v is not None for v in found)
+        with self._lock:
+            for k, vec in loaded:
+                self._remember(k, vec)
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return found
+
+    def put_many(self, keys: Iterable[bytes], vectors: Iterable[np.ndarray]) -> None:
+        rows = []
+        entries = []
+        for k, vec in zip(keys, vectors):
+            vec16 = np.asarray(vec, dtype=np.float16)
+            entries.append((k, vec16))
+            rows.append((k, vec16.tobytes()))
+        if not rows:
+            return
+
+        with self._lock:
+            for k, vec16 in entries:
+                self._remember(k, vec16)
+
+        conn = self._db()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            rows,
+        )
+        conn.commit()
+
+        with self._lock:
+            # replaced rows are counted too; prune() recounts
+            self._rows += len(rows)
+            over = self.max_rows is not None and self._rows > self.max_rows
+        if over:
+            self.prune()
+
+    # drops the oldest-written rows once the table is over max_rows; one
+    # prune at a time, other writers carry on
+    def prune(self) -> int:
+        if self.max_rows is None or not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            conn = self._db()
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excess = count - int(self.max_rows * _PRUNE_TARGET_RATIO) if count > self.max_rows else 0
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                    (excess,),
+                )
+                conn.commit()
+            with self._lock:
+                self._rows = count - max(0, excess)
+            return max(0, excess)
+        finally:
+            self._prune_lock.release()
+
+    def _remember(self, k: bytes, vec: np.ndarray) -> None:
+        self._lru[k] = vec
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+
+_cache_singleton: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _cache_singleton
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache_singleton is None:
+            _cache_singleton = EmbeddingCache(
+                path=settings.EMBEDDING_CACHE_PATH,
+                memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_rows=settings.EMBEDDING_CACHE_MAX_ROWS,
+            )
+    return _cache_singleton
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.observability.logging import get_logger
+
+log = get_logger("knowflow.embedding_pool")
+
+_MIN_SHARD = 8
+_RESULT_POLL_S = 1.0
+
+
+def _worker_main(worker_id: int, torch_threads: int, tasks, results) -> None:
+    try:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    except Exception:
+        pass
+
+    from app.memory.embeddings import get_embedding_model
+
+    try:
+        model = get_embedding_model()
+    except Exception as exc:
+        results.put(("ready", worker_id, None, f"{type(exc).__name__}: {exc}", 0.0))
+        return
+    results.put(("ready", worker_id, None, None, 0.0))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+
+        task_id, texts, batch_size = task
+        t0 = time.perf_counter()
+        try:
+            vectors = model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+            results.put((task_id, worker_id, np.asarray(vectors, dtype=np.float32), None, time.perf_counter() - t0))
+        except Exception as exc:
+            results.put((task_id, worker_id, None, f"{type(exc).__name__}: {exc}", time.perf_counter() - t0))
+
+
+# one model replica per process; encode() shards a batch evenly across them.
+class EmbeddingPool:
+
+    def __init__(self, workers: int, torch_threads: Optional[int] = None):
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = max(1, workers)
+        torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._lock = threading.Lock()
+        self._next_task = 0
+        self._stats: Dict[int, Dict[str, float]] = {
+            i: {"texts": 0, "seconds": 0.0} for i in range(self.workers)
+        }
+
+        self._processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(i, torch_threads, self._tasks, self._results),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        for p in self._processes:
+            p.start()
+
+        for _ in range(self.workers):
+            _, _, _, err, _ = self._get_result()
+            if err:
+                self.close()
+                raise RuntimeError(f"embedding worker failed to load model: {err}")
+
+    def _get_result(self):
+        while True:
+            try:
+                return self._results.get(timeout=_RESULT_POLL_S)
+            except queue.Empty:
+                dead = [p.pid for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"embedding worker(s) exited unexpectedly: {dead}")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        with self._lock:
+            shard = max(_MIN_SHARD, math.ceil(len(texts) / self.workers))
+            offsets: Dict[int, int] = {}
+            for start in range(0, len(texts), shard):
+                task_id = self._next_task
+                self._next_task += 1
+                offsets[task_id] = start
+                self._tasks.put((task_id, texts[start:start + shard], batch_size))
+
+            # wait for every shard, even after an error, so no stale result
+            # is left on the queue for the next call.
+            parts: Dict[int, np.ndarray] = {}
+            errors: List[str] = []
+            while len(parts) + len(errors) < len(offsets):
+                task_id, worker_id, vectors, err, seconds = self._get_result()
+                if err:
+                    errors.append(err)
+                    continue
+
+                parts[task_id] = vectors
+                self._stats[worker_id]["texts"] += len(vectors)
+                self._stats[worker_id]["seconds"] += seconds
+
+            if errors:
+                raise RuntimeError(f"embedding worker failed: {errors[0]}")
+
+            return np.concatenate([parts[t] for t in sorted(parts, key=offsets.get)])
+
+    def stats(self) -> List[Dict[str, float]]:
+        out = []
+        for worker_id, s in sorted(self._stats.items()):
+            seconds = s["seconds"]
+            out.append(
+                {
+                    "worker": worker_id,
+                    "texts": int(s["texts"]),
+                    "seconds": round(seconds, 2),
+                    "texts_per_s": round(s["texts"] / seconds, 1) if seconds else 0.0,
+                }
+            )
+        return out
+
+    def close(self) -> None:
+        for _ in self._processes:
+            self._tasks.put(None)
+        for p in self._processes:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+                p.join(timeout=5)
+
+        log.info("embedding_pool_closed", workers=self.workers, per_worker=self.stats())
+
+    def __enter__(self) -> "EmbeddingPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
@@ -1,25 +1,142 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import List
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from app.config import settings
+from app.memory.embedding_cache import EmbeddingCache, get_embedding_cache
+
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2" 
 VECTOR_SIZE = 384  
+MAX_SEQ_LENGTH = 512
+
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+
+
+def _load_onnx_model(quantize: bool, quant_config: str) -> SentenceTransformer:
+    if not quantize:
+        return SentenceTransformer(EMBEDDING_MODEL_NAME, backend="onnx")
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    local_dir = os.path.join(settings.EMBEDDING_ONNX_DIR, EMBEDDING_MODEL_NAME)
+    file_name = f"onnx/model_qint8_{quant_config}.onnx"
+
+    if not os.path.exists(os.path.join(local_dir, file_name)):
+        exported = SentenceTransformer(EMBEDDING_MODEL_NAME, backend="onnx")
+        exported.save_pretrained(local_dir)
+        export_dynamic_quantized_onnx_model(
+            exported,
+            quantization_config=quant_config,
+            model_name_or_path=local_dir,
+        )
+
+    return SentenceTransformer(local_dir, backend="onnx", model_kwargs={"file_name": file_name})
+
+
+def load_embedding_model(
+    backend: str = BACKEND_TORCH,
+    quantize: bool = False,
+    quant_config: str = "avx2",
+) -> SentenceTransformer:
+    if backend == BACKEND_ONNX:
+        model = _load_onnx_model(quantize, quant_config)
+    elif backend == BACKEND_TORCH:
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    model.max_seq_length = MAX_SEQ_LENGTH
+    return model
 
 
 @lru_cache(maxsize=1)
 def get_embedding_model() -> SentenceTransformer:
-    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-    model.max_seq_length = 512
-    return model
+    return load_embedding_model(
+        backend=settings.EMBEDDING_BACKEND,
+        quantize=settings.EMBEDDING_ONNX_QUANTIZE,
+        quant_config=settings.EMBEDDING_ONNX_QUANT_CONFIG,
+    )
 
 
-def embed_text(text: str) -> List[float]:
-    model = get_embedding_model()
-    vec = model.encode(text, normalize_embeddings=True)
-    return vec.tolist()
+# the same WordPiece tokenizer the model uses, without loading the model itself
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(f"sentence-transformers/{EMBEDDING_MODEL_NAME}")
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+def embedding_model_id() -> str:
+    model_id = f"{EMBEDDING_MODEL_NAME}:{MAX_SEQ_LENGTH}"
+    if settings.EMBEDDING_BACKEND == BACKEND_ONNX:
+        model_id += ":onnx"
+        if settings.EMBEDDING_ONNX_QUANTIZE:
+            model_id += f"-qint8-{settings.EMBEDDING_ONNX_QUANT_CONFIG}"
+    return model_id
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
     model = get_embedding_model()
-    vectors = model.encode(texts, normalize_embeddings=True, batch_size=16)
-    return [v.tolist() for v in vectors]
+    return model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+
+
+def embed_text(text: str) -> List[float]:
+    return embed_texts([text], batch_size=1)[0]
+
+
+@lru_cache(maxsize=1)
+def _query_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=max(1, settings.EMBEDDING_QUERY_WORKERS),
+        thread_name_prefix="embed-query",
+    )
+
+
+# for async callers: the encode runs on a small dedicated pool instead of the
+# event loop or the server's threadpool
+async def embed_text_async(text: str) -> List[float]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_query_executor(), embed_text, text)
+
+
+async def embed_texts_async(texts: List[str], batch_size: int = 16) -> List[List[float]]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_query_executor(), embed_texts, texts, batch_size)
+
+
+# encode_fn lets callers swap the in-process model for e.g. an EmbeddingPool;
+# cache lookups still happen here so only misses reach it.
+def embed_texts(
+    texts: List[str],
+    batch_size: int = 16,
+    encode_fn: Optional[Callable[[List[str], int], np.ndarray]] = None,
+) -> List[List[float]]:
+    encode_fn = encode_fn or _encode
+    cache = get_embedding_cache()
+    if cache is None:
+        return [v.tolist() for v in encode_fn(texts, batch_size)]
+
+    model_id = embedding_model_id()
+    keys = [EmbeddingCache.key(model_id, t) for t in texts]
+    vectors = cache.get_many(keys)
+
+    missing: Dict[bytes, str] = {}
+    for k, text, vec in zip(keys, texts, vectors):
+        if vec is None:
+            missing.setdefault(k, text)
+
+    if missing:
+        encoded = [np.asarray(v, dtype=np.float16) for v in encode_fn(list(missing.values()), batch_size)]
+        cache.put_many(missing.keys(), encoded)
+        computed = dict(zip(missing.keys(), encoded))
+        vectors = [vec if vec is not None else computed[k] for k, vec in zip(keys, vectors)]
+
+    # always hand out the float16-rounded vector so hits and misses agree
+    return [np.asarray(v, dtype=np.float32).tolist() for v in vectors]
@@ -1,15 +1,45 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 
 from app.core.db import Base   
 
+# furthest pipeline stage a document has completed; anything but "indexed"
+# still has work left (see app/services/ingestion_pipeline.py)
+STAGE_NEW = "new"
+STAGE_EXTRACTED = "extracted"
+STAGE_CLEANED = "cleaned"
+STAGE_INDEXED = "indexed"
+
 
 class Document(Base):
     __tablename__ = "documents"
     __table_args__ = (
         UniqueConstraint("url", name="uq_documents_url"),
+        Index(
+            "ix_documents_stage_pending",
+            "id",
+            postgresql_where=text("stage <> 'indexed'"),
+        ),
+        Index(
+            "ix_documents_raw_text_missing",
+            "id",
+            postgresql_where=text("raw_text IS NULL"),
+        ),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -24,5 +54,72 @@ class Document(Base):
 
     raw_text = Column(Text, nullable=True)      
     clean_text = Column(Text, nullable=True)    
+    clean_version = Column(String, nullable=True, index=True)
+
+    extraction_error = Column(String, nullable=True)
+    extraction_failed_at = Column(DateTime, nullable=True)
+
+    index_manifest = Column(JSONB, nullable=True)
+    stage = Column(String, nullable=False, default=STAGE_NEW, server_default=STAGE_NEW)
+
+    # dedup keys, see app/memory/dedup.py
+    norm_title = Column(String, nullable=True, index=True)
+    arxiv_id = Column(String, nullable=True, index=True)
+    arxiv_version = Column(Integer, nullable=True)
+    minhash = Column(LargeBinary, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# MinHash LSH buckets of a document's abstract, one row per band
+class DocumentBand(Base):
+    __tablename__ = "document_lsh_bands"
+
+    bucket = Column(BigInteger, primary_key=True)
+    doc_id = Column(
+        Integer,
+        ForeignKey("documents.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, index=True)
+    params = Column(JSONB, nullable=False, default=dict)
+
+    progress = Column(JSONB, nullable=False, default=dict)
+    checkpoint = Column(JSONB, nullable=False, default=dict)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    # runner that queued/runs the job ("host:pid:boot") and its last sign of
+    # life; recovery only takes over jobs whose owner has gone quiet
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# where a harvest of one arXiv query got to; results are sorted by submission
+# date (oldest first) so offsets stay valid and new papers land at the end
+class HarvestCursor(Base):
+    __tablename__ = "harvest_cursors"
+
+    id = Column(String, primary_key=True)
+    source = Column(String, nullable=False)
+    query = Column(Text, nullable=False)
+    next_start = Column(Integer, nullable=False, default=0)
+    total_results = Column(Integer, nullable=True)
+    harvested = Column(Integer, nullable=False, default=0)
+    last_published_at = Column(DateTime, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
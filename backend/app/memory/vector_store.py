@@ -1,7 +1,12 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+import weakref
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from uuid import uuid4
 
-from qdrant_client import QdrantClient
+import httpx
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
@@ -9,70 +14,493 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
+    PointIdsList,
+    FilterSelector,
+    MatchAny,
+    MatchExcept,
+    QueryRequest,
+    Range,
+    IntegerIndexParams,
+    KeywordIndexParams,
+    PayloadSchemaType,
+    HasIdCondition,
+    IsEmptyCondition,
+    Nested,
+    NestedCondition,
+    PayloadField,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    VectorParamsDiff,
+    SearchParams,
+    QuantizationSearchParams,
 )
 
 from app.config import settings
 from app.memory.embeddings import VECTOR_SIZE
+from app.observability.logging import get_logger
+
+log = get_logger("knowflow.vector_store")
 
 
 DEFAULT_COLLECTION = "knowflow_passages"
 
+# queries per query_batch_points request in search_batch
+_SEARCH_BATCH_SIZE = 256
 
-class VectorStore:
-    def __init__(self, collection_name: str = DEFAULT_COLLECTION):
-        self.client = QdrantClient(
-            url=settings.QDRANT_URL,
-            api_key=settings.QDRANT_API_KEY,
+# payload["duplicates"] is rewritten read-modify-write; serialize it in-process
+_duplicates_lock = threading.Lock()
+
+
+# payload fields we filter on. doc_id only needs exact lookups; year also gets
+# ranges ("year >= 2023"). Without an index every filtered search is a scan.
+PAYLOAD_INDEXES = {
+    "doc_id": IntegerIndexParams(type=PayloadSchemaType.INTEGER, lookup=True, range=False),
+    "year": IntegerIndexParams(type=PayloadSchemaType.INTEGER, lookup=True, range=True),
+    "section": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+    "source": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+    "content_type": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+    "duplicates[].point_id": KeywordIndexParams(type=PayloadSchemaType.KEYWORD),
+    "duplicates[].doc_id": IntegerIndexParams(type=PayloadSchemaType.INTEGER, lookup=True, range=False),
+}
+
+# a chunk is only suppressed onto a point with the same values here, so a
+# filter on them matches a suppressed chunk exactly when it matches its
+# canonical point. The fields a ref carries are matched on the ref itself.
+DUPLICATE_SHARED_FIELDS = ("year", "source", "content_type")
+_DUPLICATE_REF_FIELDS = ("doc_id", "section", "chunk_id")
+
+_RANGE_OPS = ("gt", "gte", "lt", "lte")
+_FILTER_OPS = ("eq", "ne", "in", "not_in") + _RANGE_OPS
+
+
+# collections already checked/created by this process
+_ensured_collections: set = set()
+_ensure_lock = threading.Lock()
+
+
+def _client_args() -> Dict[str, Any]:
+    pool = max(1, settings.QDRANT_POOL_SIZE)
+    if settings.QDRANT_PREFER_GRPC:
+        pooling = {"pool_size": pool}
+    else:
+        pooling = {"limits": httpx.Limits(max_connections=pool, max_keepalive_connections=pool)}
+
+    return {
+        "url": settings.QDRANT_URL,
+        "api_key": settings.QDRANT_API_KEY,
+        "prefer_grpc": settings.QDRANT_PREFER_GRPC,
+        "grpc_port": settings.QDRANT_GRPC_PORT,
+        "timeout": settings.QDRANT_TIMEOUT_S,
+        **pooling,
+    }
+
+
+def _match(field: str, value: Any) -> FieldCondition:
+    if isinstance(value, (list, tuple)):
+        return FieldCondition(key=field, match=MatchAny(any=list(value)))
+    if isinstance(value, dict) or value is None:
+        raise ValueError(f"filter on {field!r}: expected a value or a list, got {value!r}")
+    return FieldCondition(key=field, match=MatchValue(value=value))
+
+
+def _field_conditions(field: str, spec: Any, must: list, must_not: list) -> None:
+    if not isinstance(spec, dict):
+        must.append(_match(field, spec))
+        return
+
+    unknown = [op for op in spec if op not in _FILTER_OPS]
+    if unknown or not spec:
+        raise ValueError(f"filter on {field!r}: operators must be among {', '.join(_FILTER_OPS)}")
+
+    if "eq" in spec:
+        must.append(_match(field, spec["eq"]))
+    if "in" in spec:
+        if not isinstance(spec["in"], (list, tuple)):
+            raise ValueError(f"filter on {field!r}: 'in' takes a list")
+        must.append(_match(field, spec["in"]))
+    if "ne" in spec:
+        must_not.append(_match(field, spec["ne"]))
+    if "not_in" in spec:
+        if not isinstance(spec["not_in"], (list, tuple)):
+            raise ValueError(f"filter on {field!r}: 'not_in' takes a list")
+        must_not.append(_match(field, spec["not_in"]))
+
+    bounds = {op: spec[op] for op in _RANGE_OPS if op in spec}
+    if bounds:
+        for op, bound in bounds.items():
+            if isinstance(bound, bool) or not isinstance(bound, (int, float)):
+                raise ValueError(f"filter on {field!r}: {op!r} takes a number, got {bound!r}")
+        must.append(FieldCondition(key=field, range=Range(**bounds)))
+
+
+def _plain_filter(filter_by: Dict[str, Any]) -> Filter:
+    must: list = []
+    must_not: list = []
+    for field, spec in filter_by.items():
+        if field == "not":
+            if not isinstance(spec, dict) or not spec:
+                raise ValueError("'not' takes a mapping of field filters")
+            must_not.append(_plain_filter(spec))
+            continue
+        _field_conditions(field, spec, must, must_not)
+
+    return Filter(must=must or None, must_not=must_not or None)
+
+
+def _selects_documents(spec: Any) -> bool:
+    if isinstance(spec, dict):
+        return bool(spec) and all(op in ("eq", "in") for op in spec)
+    return True
+
+
+# a filter scoped to documents also matches the points holding refs to those
+# documents' suppressed chunks; only when every field can be checked on the
+# ref or is shared with the canonical point
+def _duplicates_filter(filter_by: Dict[str, Any]) -> Optional[Filter]:
+    if "doc_id" not in filter_by or not _selects_documents(filter_by["doc_id"]):
+        return None
+    if any(f not in _DUPLICATE_REF_FIELDS + DUPLICATE_SHARED_FIELDS for f in filter_by):
+        return None
+
+    on_ref = {f: v for f, v in filter_by.items() if f in _DUPLICATE_REF_FIELDS}
+    on_point = {f: v for f, v in filter_by.items() if f in DUPLICATE_SHARED_FIELDS}
+    must: list = [NestedCondition(nested=Nested(key="duplicates", filter=_plain_filter(on_ref)))]
+    if on_point:
+        must.append(_plain_filter(on_point))
+    return Filter(must=must)
+
+
+# filter_by maps a payload field to
+#   a value                    {"doc_id": 12}
+#   a list (any of)            {"section": ["methods", "results"]}
+#   operators                  {"year": {"gte": 2023}, "source": {"ne": "web"}}
+#                              eq, ne, in, not_in, gt, gte, lt, lte
+# and "not" excludes points matching all of its fields: {"not": {"section": "references"}}.
+# Raises ValueError on anything else.
+def build_filter(filter_by: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    if not filter_by:
+        return None
+
+    plain = _plain_filter(filter_by)
+    duplicates = _duplicates_filter(filter_by)
+    if duplicates is None:
+        return plain
+    return Filter(should=[plain, duplicates])
+
+
+def _vector_params() -> VectorParams:
+    return VectorParams(
+        size=VECTOR_SIZE,
+        distance=Distance.COSINE,
+        on_disk=settings.QDRANT_ON_DISK_VECTORS,
+    )
+
+
+def _hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def _quantization_config():
+    kind = settings.QDRANT_QUANTIZATION.lower()
+    always_ram = settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+    if kind == "none":
+        return None
+    if kind == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+        )
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+    raise ValueError(f"unknown QDRANT_QUANTIZATION {settings.QDRANT_QUANTIZATION!r}; use none, scalar or binary")
+
+
+def _collection_args() -> Dict[str, Any]:
+    return {
+        "vectors_config": _vector_params(),
+        "hnsw_config": _hnsw_config(),
+        "quantization_config": _quantization_config(),
+    }
+
+
+# update_collection arguments for whatever differs from the settings, or {}
+def _collection_updates(config) -> Dict[str, Any]:
+    updates: Dict[str, Any] = {}
+
+    hnsw = _hnsw_config()
+    if (config.hnsw_config.m, config.hnsw_config.ef_construct) != (hnsw.m, hnsw.ef_construct):
+        updates["hnsw_config"] = hnsw
+
+    vectors = config.params.vectors
+    if isinstance(vectors, VectorParams) and bool(vectors.on_disk) != settings.QDRANT_ON_DISK_VECTORS:
+        updates["vectors_config"] = {"": VectorParamsDiff(on_disk=settings.QDRANT_ON_DISK_VECTORS)}
+
+    wanted = _quantization_config()
+    if wanted != config.quantization_config:
+        updates["quantization_config"] = wanted if wanted is not None else Disabled.DISABLED
+    return updates
+
+
+# what an existing collection needs to match the settings: update_collection
+# arguments, and the payload indexes it is missing. Building an index on a
+# large collection happens in the background on the Qdrant side.
+def _collection_changes(info) -> Tuple[Dict[str, Any], List[Tuple[str, Any]]]:
+    existing = info.payload_schema or {}
+    indexes = [(field, schema) for field, schema in PAYLOAD_INDEXES.items() if field not in existing]
+    return _collection_updates(info.config), indexes
+
+
+# search-time HNSW/quantization parameters. exact=True is a full scan on the
+# original vectors (the ground truth in scripts.bench_vector_search).
+def search_params(
+    hnsw_ef: int | None = None,
+    exact: bool = False,
+    rescore: bool | None = None,
+) -> SearchParams:
+
+    quantization = None
+    if exact:
+        quantization = QuantizationSearchParams(ignore=True)
+    elif settings.QDRANT_QUANTIZATION.lower() != "none":
+        quantization = QuantizationSearchParams(
+            rescore=settings.QDRANT_QUANTIZATION_RESCORE if rescore is None else rescore,
+            oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING,
+        )
+    return SearchParams(
+        hnsw_ef=hnsw_ef or settings.QDRANT_HNSW_EF,
+        exact=exact,
+        quantization=quantization,
+    )
+
+
+def _shared_condition(field: str, value: Any):
+    if value is None:
+        return IsEmptyCondition(is_empty=PayloadField(key=field))
+    return FieldCondition(key=field, match=MatchValue(value=value))
+
+
+def _batch_requests(
+    query_embeddings: List[List[float]],
+    top_k: int,
+    filter_by: Optional[Dict[str, Any]],
+) -> List[List[QueryRequest]]:
+
+    qdrant_filter = build_filter(filter_by)
+    params = search_params()
+    requests = [
+        QueryRequest(query=emb, filter=qdrant_filter, params=params, limit=top_k, with_payload=True)
+        for emb in query_embeddings
+    ]
+    return [requests[i:i + _SEARCH_BATCH_SIZE] for i in range(0, len(requests), _SEARCH_BATCH_SIZE)]
+
+
+def _hits_to_dicts(hits) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for h in hits:
+        payload = h.payload or {}
+        results.append(
+            {
+                "id": h.id,
+                "score": h.score,
+                "text": payload.get("text", ""),
+                "metadata": {k: v for k, v in payload.items() if k != "text"},
+            }
         )
+    return results
+
+
+# one client (and connection pool) per process. The client is thread-safe;
+# qdrant-client would otherwise turn keep-alive off for localhost.
+@lru_cache(maxsize=1)
+def get_qdrant_client() -> QdrantClient:
+    return QdrantClient(**_client_args())
+
+
+# async connections belong to the loop that opened them, so one client per loop
+# (in the server that is just the main loop)
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncQdrantClient(**_client_args())
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_qdrant_client() -> None:
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+# asyncio locks are bound to one loop, like the async clients
+_async_ensure_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _async_ensure_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _async_ensure_locks.get(loop)
+    if lock is None:
+        lock = _async_ensure_locks[loop] = asyncio.Lock()
+    return lock
+
+
+def close_qdrant_client() -> None:
+    if get_qdrant_client.cache_info().currsize:
+        get_qdrant_client().close()
+        get_qdrant_client.cache_clear()
+    get_vector_store.cache_clear()
+    get_async_vector_store.cache_clear()
+    with _ensure_lock:
+        _ensured_collections.clear()
+
+
+# called at startup so the first search doesn't pay for connecting and the
+# collection check; if Qdrant isn't up yet that happens on first use instead
+def init_vector_store() -> None:
+    try:
+        get_vector_store()
+    except Exception as exc:
+        log.warning("qdrant_unavailable_at_startup", url=settings.QDRANT_URL, error=str(exc))
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(collection_name: str = DEFAULT_COLLECTION) -> "VectorStore":
+    return VectorStore(collection_name)
+
+
+@lru_cache(maxsize=None)
+def get_async_vector_store(collection_name: str = DEFAULT_COLLECTION) -> "AsyncVectorStore":
+    return AsyncVectorStore(collection_name)
+
+
+class VectorStore:
+    def __init__(self, collection_name: str = DEFAULT_COLLECTION, client: QdrantClient | None = None):
+        self.client = client or get_qdrant_client()
         self.collection_name = collection_name
         self._ensure_collection()
 
     def _ensure_collection(self):
-        if not self.client.collection_exists(self.collection_name):
-            self.client.create_collection(
+        if self.collection_name in _ensured_collections:
+            return
+
+        with _ensure_lock:
+            if self.collection_name in _ensured_collections:
+                return
+            if not self.client.collection_exists(self.collection_name):
+                self.client.create_collection(collection_name=self.collection_name, **_collection_args())
+                log.info("qdrant_collection_created", collection=self.collection_name)
+            self._apply_collection_changes()
+            _ensured_collections.add(self.collection_name)
+
+    def _apply_collection_changes(self):
+        updates, indexes = _collection_changes(self.client.get_collection(self.collection_name))
+        if updates:
+            self.client.update_collection(collection_name=self.collection_name, **updates)
+            log.info("qdrant_collection_config_updated", collection=self.collection_name, changed=sorted(updates))
+        for field, schema in indexes:
+            self.client.create_payload_index(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(
-                    size=VECTOR_SIZE,
-                    distance=Distance.COSINE,
-                ),
+                field_name=field,
+                field_schema=schema,
+                wait=False,
             )
+            log.info("qdrant_payload_index_created", collection=self.collection_name, field=field)
 
     def reset_collection(self):
-        self.client.recreate_collection(
-            collection_name=self.collection_name,
-            vectors_config=VectorParams(
-                size=VECTOR_SIZE,
-                distance=Distance.COSINE,
-            ),
-        )
+        self.client.recreate_collection(collection_name=self.collection_name, **_collection_args())
+        self._apply_collection_changes()
 
     def upsert_passages(
         self,
         texts: List[str],
         embeddings: List[List[float]],
         metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
     ):
 
         if metadatas is None:
             metadatas = [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid4()) for _ in texts]
 
-        points = []
-        for text, emb, meta in zip(texts, embeddings, metadatas):
-            payload = {
-                "text": text,
-                **meta,
-            }
-            points.append(
-                PointStruct(
-                    id=str(uuid4()),
-                    vector=emb,
-                    payload=payload,
+        # re-upserting a point (forced re-index) must keep the refs to the
+        # chunks suppressed onto it, or those chunks drop out of the index
+        with _duplicates_lock:
+            held: Dict[str, List[Dict[str, Any]]] = {}
+            if ids:
+                for r in self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=ids,
+                    with_payload=["duplicates"],
+                ):
+                    if (r.payload or {}).get("duplicates"):
+                        held[str(r.id)] = r.payload["duplicates"]
+
+            points = []
+            for point_id, text, emb, meta in zip(ids, texts, embeddings, metadatas):
+                payload = {
+                    "text": text,
+                    **meta,
+                }
+                if str(point_id) in held:
+                    payload["duplicates"] = held[str(point_id)]
+                points.append(
+                    PointStruct(
+                        id=point_id,
+                        vector=emb,
+                        payload=payload,
+                    )
                 )
+
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=points,
+                wait=True,
+            )
+
+    def delete_points(self, ids: List[str]):
+        if not ids:
+            return
+
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=PointIdsList(points=ids),
+            wait=True,
+        )
+
+    def document_point_ids(self, doc_id: int) -> List[str]:
+        ids: List[str] = []
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=Filter(
+                    must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
+                ),
+                with_payload=False,
+                limit=256,
+                offset=offset,
             )
+            ids.extend(str(r.id) for r in records)
+            if offset is None:
+                return ids
 
-        self.client.upsert(
+    def delete_document(self, doc_id: int):
+        self.client.delete(
             collection_name=self.collection_name,
-            points=points,
+            points_selector=FilterSelector(
+                filter=Filter(
+                    must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
+                )
+            ),
             wait=True,
         )
 
@@ -83,36 +511,203 @@ class VectorStore:
         filter_by: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
 
-        qdrant_filter = None
-        if filter_by:
-            conditions = []
-            for field, value in filter_by.items():
-                conditions.append(
-                    FieldCondition(
-                        key=field,
-                        match=MatchValue(value=value),
+        response = self.client.query_points(
+            collection_name=self.collection_name,
+            query=query_embedding,
+            query_filter=build_filter(filter_by),
+            search_params=search_params(),
+            limit=top_k,
+        )
+        return _hits_to_dicts(response.points)
+
+    # one result list per embedding, in order; one round-trip per _SEARCH_BATCH_SIZE queries
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+
+        results: List[List[Dict[str, Any]]] = []
+        for requests in _batch_requests(query_embeddings, top_k, filter_by):
+            responses = self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=requests,
+            )
+            results.extend(_hits_to_dicts(r.points) for r in responses)
+        return results
+
+    # for each vector, the id of the most similar other point with the same
+    # DUPLICATE_SHARED_FIELDS scoring at least `threshold`, or None. Points of
+    # the same document count too, so repeats within a document are caught
+    # across batches.
+    def find_near_duplicates(
+        self,
+        embeddings: List[List[float]],
+        point_ids: List[str],
+        metadatas: List[Dict[str, Any]],
+        threshold: float,
+    ) -> List[Optional[str]]:
+
+        if not embeddings:
+            return []
+
+        params = search_params()
+        requests = [
+            QueryRequest(
+                query=emb,
+                filter=Filter(
+                    must=[_shared_condition(f, meta.get(f)) for f in DUPLICATE_SHARED_FIELDS],
+                    must_not=[HasIdCondition(has_id=[point_id])],
+                ),
+                params=params,
+                limit=1,
+                score_threshold=threshold,
+                with_payload=False,
+            )
+            for emb, point_id, meta in zip(embeddings, point_ids, metadatas)
+        ]
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=requests,
+        )
+        return [str(r.points[0].id) if r.points else None for r in responses]
+
+    # append refs ({"point_id", "doc_id", "section", "chunk_id"}) to the
+    # payload["duplicates"] list of each canonical point
+    def add_duplicates(self, refs_by_point: Dict[str, List[Dict[str, Any]]]):
+        if not refs_by_point:
+            return
+
+        with _duplicates_lock:
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=list(refs_by_point),
+                with_payload=["duplicates"],
+            )
+            for r in records:
+                existing = (r.payload or {}).get("duplicates") or []
+                known = {d["point_id"] for d in existing}
+                merged = existing + [d for d in refs_by_point[str(r.id)] if d["point_id"] not in known]
+                self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"duplicates": merged},
+                    points=[r.id],
+                    wait=True,
+                )
+
+    def get_duplicates(self, ids: List[str]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=["duplicates"],
+        )
+        refs: List[Dict[str, Any]] = []
+        for r in records:
+            refs.extend((r.payload or {}).get("duplicates") or [])
+        return refs
+
+    # drop refs to these (suppressed) point ids from whichever points hold them
+    def remove_duplicate_refs(self, ids: List[str]):
+        if not ids:
+            return
+
+        gone = set(ids)
+        holders = Filter(
+            must=[FieldCondition(key="duplicates[].point_id", match=MatchAny(any=list(gone)))]
+        )
+        with _duplicates_lock:
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=holders,
+                    with_payload=["duplicates"],
+                    limit=256,
+                    offset=offset,
+                )
+                for r in records:
+                    kept = [d for d in (r.payload or {}).get("duplicates") or [] if d["point_id"] not in gone]
+                    self.client.set_payload(
+                        collection_name=self.collection_name,
+                        payload={"duplicates": kept},
+                        points=[r.id],
+                        wait=True,
                     )
+                if offset is None:
+                    break
+
+
+# read path for async callers (the /retrieval/search route, the async query
+# graph); indexing stays on the sync VectorStore
+class AsyncVectorStore:
+    def __init__(self, collection_name: str = DEFAULT_COLLECTION):
+        self.collection_name = collection_name
+
+    @property
+    def client(self) -> AsyncQdrantClient:
+        return get_async_qdrant_client()
+
+    async def _ensure_collection(self):
+        # usually already done by the sync store at startup
+        if self.collection_name in _ensured_collections:
+            return
+
+        async with _async_ensure_lock():
+            if self.collection_name in _ensured_collections:
+                return
+            if not await self.client.collection_exists(self.collection_name):
+                await self.client.create_collection(collection_name=self.collection_name, **_collection_args())
+                log.info("qdrant_collection_created", collection=self.collection_name)
+
+            updates, indexes = _collection_changes(await self.client.get_collection(self.collection_name))
+            if updates:
+                await self.client.update_collection(collection_name=self.collection_name, **updates)
+                log.info("qdrant_collection_config_updated", collection=self.collection_name, changed=sorted(updates))
+            for field, schema in indexes:
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=schema,
+                    wait=False,
                 )
-            qdrant_filter = Filter(must=conditions)
+                log.info("qdrant_payload_index_created", collection=self.collection_name, field=field)
+            with _ensure_lock:
+                _ensured_collections.add(self.collection_name)
 
-        response = self.client.query_points(
+    async def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+
+        await self._ensure_collection()
+        response = await self.client.query_points(
             collection_name=self.collection_name,
             query=query_embedding,
-            query_filter=qdrant_filter,
+            query_filter=build_filter(filter_by),
+            search_params=search_params(),
             limit=top_k,
         )
+        return _hits_to_dicts(response.points)
 
-        hits = response.points  
-
-        results: List[Dict[str, Any]] = []
-        for h in hits:
-            payload = h.payload or {}
-            results.append(
-                {
-                    "id": h.id,
-                    "score": h.score,
-                    "text": payload.get("text", ""),
-                    "metadata": {k: v for k, v in payload.items() if k != "text"},
-                }
+    async def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        filter_by: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+
+        await self._ensure_collection()
+        results: List[List[Dict[str, Any]]] = []
+        for requests in _batch_requests(query_embeddings, top_k, filter_by):
+            responses = await self.client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=requests,
             )
-        return results
\ No newline at end of file
+            results.extend(_hits_to_dicts(r.points) for r in responses)
+        return results
@@ -1,3 +1,4 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from app.orchestrator.state import OrchestratorState
@@ -10,7 +11,8 @@ def build_orchestrator_graph():
 
 
     graph.add_node("intent", nodes.intent_node)
-    graph.add_node("retrieval", nodes.retrieval_node)
+    # sync under invoke, awaits the async Qdrant client under ainvoke
+    graph.add_node("retrieval", RunnableLambda(nodes.retrieval_node, afunc=nodes.retrieval_node_async))
     graph.add_node("summarizer", nodes.summarizer_node)
     graph.add_node("concepts", nodes.concepts_node)
     graph.add_node("insight", nodes.insight_node)
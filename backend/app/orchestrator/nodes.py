@@ -2,7 +2,7 @@ from typing import List, Optional, Dict, Any
 
 from app.orchestrator.state import OrchestratorState, Passage
 from app.agents.intent_agent import IntentAgent
-from app.agents.retriever_agent import RetrieverAgent
+from app.agents.retriever_agent import AsyncRetrieverAgent, RetrieverAgent
 from app.agents.summarizer_agent import SummarizerAgent
 from app.agents.insight_agent import InsightAgent
 from app.agents.concept_graph_agent import ConceptGraphAgent
@@ -18,6 +18,7 @@ log = get_logger("knowflow.retrieval")
 
 intent_agent = IntentAgent()
 _retriever_agent: Optional[RetrieverAgent] = None  # lazy
+_async_retriever_agent: Optional[AsyncRetrieverAgent] = None  # lazy
 summarizer_agent = SummarizerAgent()
 concept_agent = ConceptGraphAgent()
 insight_agent = InsightAgent()
@@ -33,17 +34,20 @@ def _get_retriever() -> RetrieverAgent:
     return _retriever_agent
 
 
+def _get_async_retriever() -> AsyncRetrieverAgent:
+    global _async_retriever_agent
+    if _async_retriever_agent is None:
+        _async_retriever_agent = AsyncRetrieverAgent()
+    return _async_retriever_agent
+
+
 def intent_node(state: OrchestratorState) -> OrchestratorState:
     result = intent_agent.analyze(state.question)
     state.intent = result.intent
     state.sub_tasks = result.sub_tasks
     return state
 
-def retrieval_node(state: OrchestratorState) -> OrchestratorState:
-    log.info("retrieval_params", top_k=state.top_k, retry_count=state.retry_count, temperature=state.temperature, enable_llm_critique=state.enable_llm_critique,)
-    retriever = _get_retriever() 
-    hits = retriever.retrieve(query=state.question, top_k=state.top_k)
-
+def _set_passages(state: OrchestratorState, hits: List[Dict]) -> OrchestratorState:
     state.retrieved_passages = [
         Passage(
             text=h["text"],
@@ -55,6 +59,20 @@ def retrieval_node(state: OrchestratorState) -> OrchestratorState:
     return state
 
 
+def retrieval_node(state: OrchestratorState) -> OrchestratorState:
+    log.info("retrieval_params", top_k=state.top_k, retry_count=state.retry_count, temperature=state.temperature, enable_llm_critique=state.enable_llm_critique,)
+    retriever = _get_retriever() 
+    hits = retriever.retrieve(query=state.question, top_k=state.top_k)
+    return _set_passages(state, hits)
+
+
+# used when the graph runs with ainvoke
+async def retrieval_node_async(state: OrchestratorState) -> OrchestratorState:
+    log.info("retrieval_params", top_k=state.top_k, retry_count=state.retry_count, temperature=state.temperature, enable_llm_critique=state.enable_llm_critique,)
+    hits = await _get_async_retriever().retrieve(query=state.question, top_k=state.top_k)
+    return _set_passages(state, hits)
+
+
 def post_summary_selector(state: OrchestratorState) -> str:
     return "evaluator"
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Optional
 from enum import Enum
 from datetime import datetime
@@ -20,3 +20,7 @@ class CollectItem(BaseModel):
     year: Optional[int] = None         
     raw_text: Optional[str] = None     
     created_at: Optional[datetime] = None
+
+
+class CollectBatch(BaseModel):
+    items: List[CollectItem] = Field(default_factory=list, max_length=1000)
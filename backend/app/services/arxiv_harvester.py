@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.jobs.runner import JobContext
+from app.memory.document_store import save_metadata_batch
+from app.memory.models import HarvestCursor
+from app.observability.logging import get_logger
+from app.schemas.collect import CollectItem, ContentType
+
+log = get_logger("knowflow.harvester")
+
+SOURCE_ARXIV = "arxiv"
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+_WS_RE = re.compile(r"\s+")
+
+# "existing" and "duplicate" point at a document that is already processed
+_NEEDS_INGESTION = ("created", "replaced")
+
+
+def cursor_id(query: str) -> str:
+    return f"{SOURCE_ARXIV}:{hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _text(entry: ET.Element, tag: str) -> Optional[str]:
+    el = entry.find(_ATOM + tag)
+    if el is None or not el.text:
+        return None
+    return _WS_RE.sub(" ", el.text).strip() or None
+
+
+def _published(entry: ET.Element) -> Optional[datetime]:
+    value = _text(entry, "published")
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+# same mapping as the n8n "Map To Document" node
+def parse_entry(entry: ET.Element) -> Optional[CollectItem]:
+    url = None
+    pdf_url = None
+    for link in entry.findall(_ATOM + "link"):
+        if link.get("rel") == "alternate" and link.get("type") == "text/html":
+            url = link.get("href")
+        if link.get("type") == "application/pdf":
+            pdf_url = link.get("href")
+
+    authors = [
+        name
+        for name in (_text(a, "name") for a in entry.findall(_ATOM + "author"))
+        if name
+    ]
+    published = _published(entry)
+
+    try:
+        return CollectItem(
+            source=SOURCE_ARXIV,
+            content_type=ContentType.pdf if pdf_url else ContentType.web_page,
+            title=_text(entry, "title") or "",
+            abstract=_text(entry, "summary"),
+            url=url or _text(entry, "id"),
+            pdf_url=pdf_url,
+            authors=authors,
+            year=published.year if published else None,
+        )
+    except ValidationError as exc:
+        log.warning("arxiv_entry_invalid", entry_id=_text(entry, "id"), error=str(exc))
+        return None
+
+
+class _Page:
+
+    def __init__(self, start: int):
+        self.start = start
+        self.items: List[CollectItem] = []
+        self.entries = 0
+        self.total: Optional[int] = None
+        self.last_published: Optional[datetime] = None
+        # False if it still had fewer entries than expected after the retries
+        self.complete = True
+
+
+class _RateLimiter:
+    # spaces request starts at least `interval` seconds apart; requests may
+    # still overlap, which is where the concurrency comes from
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = loop.time() + self.interval
+
+
+# parses the feed while it downloads; entries are cleared once mapped
+async def _fetch_page(
+    client: httpx.AsyncClient,
+    limiter: _RateLimiter,
+    api_url: str,
+    query: str,
+    start: int,
+    page_size: int,
+) -> _Page:
+
+    await limiter.wait()
+
+    page = _Page(start)
+    parser = ET.XMLPullParser(events=("end",))
+    params = {
+        "search_query": query,
+        "start": start,
+        "max_results": page_size,
+        "sortBy": "submittedDate",
+        "sortOrder": "ascending",
+    }
+    async with client.stream("GET", api_url, params=params) as response:
+        response.raise_for_status()
+        async for data in response.aiter_bytes():
+            parser.feed(data)
+            for _, el in parser.read_events():
+                if el.tag == _ATOM + "entry":
+                    page.entries += 1
+                    item = parse_entry(el)
+                    if item is not None:
+                        page.items.append(item)
+                    published = _published(el)
+                    if published and (page.last_published is None or published > page.last_published):
+                        page.last_published = published
+                    el.clear()
+                elif el.tag == _OPENSEARCH + "totalResults" and el.text:
+                    page.total = int(el.text)
+    parser.close()
+    return page
+
+
+class ArxivHarvester:
+
+    def __init__(
+        self,
+        db: Session,
+        query: str | None = None,
+        api_url: str | None = None,
+        page_size: int | None = None,
+        concurrency: int | None = None,
+        request_interval_s: float | None = None,
+        on_saved: Optional[Callable[[List[int]], None]] = None,
+        job: JobContext | None = None,
+    ):
+        self.db = db
+        self.query = query or settings.ARXIV_QUERY
+        self.api_url = api_url or settings.ARXIV_API_URL
+        self.page_size = page_size or settings.ARXIV_PAGE_SIZE
+        self.concurrency = concurrency or settings.ARXIV_CONCURRENCY
+        self.request_interval_s = (
+            settings.ARXIV_REQUEST_INTERVAL_S if request_interval_s is None else request_interval_s
+        )
+        self.on_saved = on_saved
+        self.job = job
+        # set once a short page is saved; the cursor stays before it
+        self._gap_at: Optional[int] = None
+
+        self.stats: Dict[str, int] = {
+            "pages": 0,
+            "entries": 0,
+            "created": 0,
+            "existing": 0,
+            "replaced": 0,
+            "duplicate": 0,
+        }
+        # a resumed job keeps counting where it left off
+        if job is not None:
+            self.stats.update({k: job.progress.get(k, v) for k, v in self.stats.items()})
+
+    def cursor(self) -> HarvestCursor:
+        key = cursor_id(self.query)
+        cursor = self.db.get(HarvestCursor, key)
+        if cursor is None:
+            cursor = HarvestCursor(id=key, source=SOURCE_ARXIV, query=self.query, next_start=0, harvested=0)
+            self.db.add(cursor)
+            self.db.commit()
+        return cursor
+
+    def reset(self) -> None:
+        cursor = self.cursor()
+        cursor.next_start = 0
+        cursor.total_results = None
+        cursor.harvested = 0
+        cursor.last_published_at = None
+        self.db.commit()
+
+    def run(self, max_results: int | None = None) -> Dict[str, int]:
+        asyncio.run(self._run(max_results))
+        return dict(self.stats)
+
+    # pages are fetched ahead (up to `concurrency` at once) but written in
+    # order, so the cursor only ever moves past pages that are saved
+    async def _run(self, max_results: int | None) -> None:
+        self._gap_at = None
+        cursor = self.cursor()
+        start = cursor.next_start
+        stop = start + max_results if max_results is not None else None
+        if stop is not None and stop <= start:
+            return
+        limiter = _RateLimiter(self.request_interval_s)
+
+        log.info("arxiv_harvest_started", cursor=cursor.id, start=start, max_results=max_results)
+
+        async with httpx.AsyncClient(
+            timeout=settings.ARXIV_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+            follow_redirects=True,
+        ) as client:
+
+            def fetch(page_start: int) -> asyncio.Task:
+                size = self.page_size if stop is None else min(self.page_size, stop - page_start)
+                return asyncio.create_task(self._fetch_with_retries(client, limiter, page_start, size))
+
+            # the first page tells us how many results there are
+            first = await fetch(start)
+            total = first.total
+            await asyncio.to_thread(self._save_page, first)
+            if not first.entries:
+                return
+
+            in_flight: Dict[int, asyncio.Task] = {}
+            next_start = start + self.page_size
+
+            def limit() -> int:
+                bound = total if total is not None else next_start + 1
+                return bound if stop is None else min(bound, stop)
+
+            try:
+                while True:
+                    while len(in_flight) < self.concurrency and next_start < limit():
+                        in_flight[next_start] = fetch(next_start)
+                        next_start += self.page_size
+                    if not in_flight:
+                        break
+
+                    page = await in_flight.pop(min(in_flight))
+                    if page.total is not None:
+                        total = page.total
+                    await asyncio.to_thread(self._save_page, page)
+
+                    if self.job is not None:
+                        self.job.raise_if_cancelled()
+                    if not page.entries:
+                        break
+            finally:
+                for task in in_flight.values():
+                    task.cancel()
+
+        if self._gap_at is not None:
+            log.warning("arxiv_harvest_gap", cursor=cursor.id, next_start=self._gap_at)
+        log.info("arxiv_harvest_finished", cursor=cursor.id, **self.stats)
+
+    # arXiv sometimes answers with an empty or short page before the end of
+    # the results; those are retried like HTTP errors
+    async def _fetch_with_retries(
+        self,
+        client: httpx.AsyncClient,
+        limiter: _RateLimiter,
+        start: int,
+        size: int,
+    ) -> _Page:
+
+        attempt = 0
+        while True:
+            try:
+                page = await _fetch_page(client, limiter, self.api_url, self.query, start, size)
+                expected = size if page.total is None else min(size, max(0, page.total - start))
+                if page.entries >= expected or attempt >= settings.ARXIV_MAX_RETRIES:
+                    if page.entries < expected:
+                        page.complete = False
+                        log.warning("arxiv_short_page", start=start, entries=page.entries, expected=expected)
+                    return page
+            except (httpx.HTTPError, ET.ParseError) as exc:
+                if attempt >= settings.ARXIV_MAX_RETRIES:
+                    raise
+                log.warning("arxiv_page_retry", start=start, attempt=attempt + 1, error=str(exc))
+            attempt += 1
+
+    def _save_page(self, page: _Page) -> None:
+        results = save_metadata_batch(self.db, page.items) if page.items else []
+
+        # the cursor covers a contiguous run of complete pages only: a short
+        # page's missing entries may be anywhere in it, so the next run starts
+        # at that page again (its saved items are matched, not created twice)
+        cursor = self.cursor()
+        if self._gap_at is None:
+            if not page.complete:
+                self._gap_at = page.start
+            elif page.entries:
+                cursor.next_start = page.start + page.entries
+        if page.total is not None:
+            cursor.total_results = page.total
+        cursor.harvested += len(page.items)
+        if page.last_published and (
+            cursor.last_published_at is None or page.last_published > cursor.last_published_at
+        ):
+            cursor.last_published_at = page.last_published
+        self.db.commit()
+
+        self.stats["pages"] += 1
+        self.stats["entries"] += page.entries
+        for r in results:
+            self.stats[r["status"]] = self.stats.get(r["status"], 0) + 1
+        if self.job is not None:
+            self.job.update(**self.stats, next_start=cursor.next_start, total_results=cursor.total_results)
+
+        new_ids = [r["doc_id"] for r in results if r["status"] in _NEEDS_INGESTION]
+        if new_ids and self.on_saved is not None:
+            self.on_saved(new_ids)
+
+
+def _submit_for_ingestion(doc_ids: List[int]) -> None:
+    from app.services.ingestion_pipeline import get_ingestion_pipeline
+
+    get_ingestion_pipeline().submit(doc_ids)
+
+
+def harvest_arxiv(
+    db: Session,
+    query: str | None = None,
+    max_results: int | None = None,
+    api_url: str | None = None,
+    reset: bool = False,
+    job: JobContext | None = None,
+) -> Dict[str, int]:
+
+    harvester = ArxivHarvester(
+        db,
+        query=query,
+        api_url=api_url,
+        on_saved=_submit_for_ingestion if settings.INGEST_ON_COLLECT else None,
+        job=job,
+    )
+    # a resumed job only harvests what the first attempt had left
+    if job is not None and max_results is not None:
+        max_results = max(0, max_results - job.progress.get("entries", 0))
+    if reset and not (job is not None and job.progress):
+        harvester.reset()
+    return harvester.run(max_results)
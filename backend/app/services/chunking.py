@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterator, List, Tuple
+
+from app.config import settings
+from app.memory.embeddings import MAX_SEQ_LENGTH, get_tokenizer
+
+# [CLS] and [SEP] are added by the model on top of the chunk's own tokens.
+_SPECIAL_TOKENS = 2
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# only the whitespace (group 1) is dropped; closing quotes and brackets stay
+# with the sentence they end
+_SENTENCE_RE = re.compile(r"[.!?][\"')\]]*(\s+)(?=[A-Z0-9(\[\"'])")
+
+# a paragraph that doesn't fit the remaining budget starts a new chunk, as long
+# as the current one is at least this full.
+_MIN_FILL = 0.5
+
+
+def _paragraphs(text: str) -> Iterator[str]:
+    start = 0
+    for m in _PARAGRAPH_RE.finditer(text):
+        p = text[start:m.start()].strip()
+        if p:
+            yield p
+        start = m.end()
+    p = text[start:].strip()
+    if p:
+        yield p
+
+
+def _sentences(paragraph: str) -> List[str]:
+    sentences = []
+    start = 0
+    for m in _SENTENCE_RE.finditer(paragraph):
+        sentences.append(paragraph[start:m.start(1)])
+        start = m.end(1)
+    sentences.append(paragraph[start:])
+    return sentences
+
+
+def _split_long(tokenizer, sentence: str, max_tokens: int) -> List[Tuple[str, int]]:
+    enc = tokenizer(sentence, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = enc["offset_mapping"]
+    pieces = []
+    for i in range(0, len(offsets), max_tokens):
+        window = offsets[i:i + max_tokens]
+        piece = sentence[window[0][0]:window[-1][1]].strip()
+        if piece:
+            pieces.append((piece, len(window)))
+    return pieces
+
+
+# one list of (sentence, token count) per paragraph. WordPiece pre-splits on
+# whitespace, so per-sentence counts add up to the count of the joined text.
+def _paragraph_units(tokenizer, text: str, max_tokens: int) -> Iterator[List[Tuple[str, int]]]:
+    for paragraph in _paragraphs(text):
+        sentences = _sentences(paragraph)
+        counts = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+
+        units: List[Tuple[str, int]] = []
+        for sentence, n in zip(sentences, counts):
+            if n <= max_tokens:
+                units.append((sentence, n))
+            else:
+                units.extend(_split_long(tokenizer, sentence, max_tokens))
+        yield units
+
+
+class _Chunk:
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.units: List[Tuple[Tuple[str, int], bool]] = []
+        self.tokens = 0
+
+    def add(self, unit: Tuple[str, int], new_paragraph: bool) -> None:
+        if self.parts:
+            self.parts.append("\n\n" if new_paragraph else " ")
+        self.parts.append(unit[0])
+        self.units.append((unit, new_paragraph))
+        self.tokens += unit[1]
+
+    def render(self, chunk_id: int) -> Dict:
+        return {"chunk_id": chunk_id, "text": "".join(self.parts), "tokens": self.tokens}
+
+    # trailing sentences of this chunk, up to overlap_tokens, seeded into the next one
+    def overlap(self, overlap_tokens: int) -> "_Chunk":
+        tail = []
+        n = 0
+        for unit, new_paragraph in reversed(self.units):
+            if n + unit[1] > overlap_tokens:
+                break
+            tail.append((unit, new_paragraph))
+            n += unit[1]
+
+        nxt = _Chunk()
+        for unit, new_paragraph in reversed(tail):
+            nxt.add(unit, new_paragraph)
+        return nxt
+
+
+# greedy packing of sentences into chunks of at most max_tokens, breaking at
+# paragraph ends where possible. A chunk cut mid-paragraph starts the next one
+# with its last sentences (up to overlap_tokens) for context.
+def iter_chunks(
+    text: str,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+    tokenizer=None,
+) -> Iterator[Dict]:
+    if not text or not text.strip():
+        return
+
+    max_tokens = min(max_tokens or settings.CHUNK_MAX_TOKENS, MAX_SEQ_LENGTH - _SPECIAL_TOKENS)
+    overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    tokenizer = tokenizer or get_tokenizer()
+
+    chunk = _Chunk()
+    chunk_id = 0
+
+    for units in _paragraph_units(tokenizer, text, max_tokens):
+        paragraph_tokens = sum(n for _, n in units)
+        if (
+            chunk.tokens + paragraph_tokens > max_tokens
+            and chunk.tokens >= max_tokens * _MIN_FILL
+        ):
+            yield chunk.render(chunk_id)
+            chunk_id += 1
+            chunk = _Chunk()
+
+        for i, unit in enumerate(units):
+            if chunk.tokens and chunk.tokens + unit[1] > max_tokens:
+                yield chunk.render(chunk_id)
+                chunk_id += 1
+                chunk = chunk.overlap(min(overlap_tokens, max_tokens - unit[1]))
+            chunk.add(unit, new_paragraph=i == 0)
+
+    if chunk.tokens:
+        yield chunk.render(chunk_id)
@@ -1,23 +1,80 @@
-from sqlalchemy.orm import Session
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from sqlalchemy.orm import Session, load_only
+from app.config import settings
 from app.core.db import SessionLocal
-from app.memory.models import Document
-from app.cleaning.text_cleaning import clean_raw_text
+from app.memory.models import Document, STAGE_CLEANED
+from app.memory.document_store import iter_document_batches, needs_cleaning
+from app.jobs.runner import JobContext
+from app.cleaning.text_cleaning import CLEANER_VERSION, clean_raw_text
+from app.observability.logging import get_logger
 
+log = get_logger("knowflow.cleaning")
 
-def clean_all_documents():
 
-    db: Session = SessionLocal()
-    try:
-        docs = (
-            db.query(Document)
-            .filter(Document.raw_text.isnot(None))
-            .all()
+def clean_documents(
+    db: Session,
+    limit: int | None = None,
+    force: bool = False,
+    job: JobContext | None = None,
+) -> int:
+
+    query = (
+        db.query(Document)
+        .options(load_only(Document.id, Document.raw_text))
+        .filter(Document.raw_text.isnot(None))
+    )
+    if not force:
+        query = query.filter(needs_cleaning())
+
+    workers = settings.CLEAN_WORKERS or os.cpu_count() or 1
+    batch_size = settings.CLEAN_BATCH_SIZE
+
+    after_id = 0
+    if job is not None:
+        after_id = job.checkpoint.get("after_id", 0)
+        if limit is not None:
+            limit = max(0, limit - job.progress.get("processed", 0))
+
+    count = 0
+    # spawn, not fork: this runs on a job runner thread inside the server
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        batches = iter_document_batches(
+            db, query, batch_size=batch_size, limit=limit, after_id=after_id
         )
+        for docs in batches:
+            texts = [doc.raw_text or "" for doc in docs]
+            cleaned = pool.map(clean_raw_text, texts, chunksize=max(1, len(texts) // (workers * 4)))
 
-        for doc in docs:
-            cleaned = clean_raw_text(doc.raw_text or "")
-            doc.clean_text = cleaned
+            rows: List[Dict] = [
+                {
+                    "id": doc.id,
+                    "clean_text": text,
+                    "clean_version": CLEANER_VERSION,
+                    "stage": STAGE_CLEANED,
+                }
+                for doc, text in zip(docs, cleaned)
+            ]
+            db.bulk_update_mappings(Document, rows)
+            count += len(rows)
 
-        db.commit()
+            if job is not None:
+                db.commit()
+                job.increment(processed=len(rows))
+                job.save_checkpoint(after_id=docs[-1].id)
+                job.raise_if_cancelled()
+
+    log.info("cleaning_done", cleaned=count, workers=workers, cleaner_version=CLEANER_VERSION)
+    return count
+
+
+def clean_all_documents():
+
+    db: Session = SessionLocal()
+    try:
+        return clean_documents(db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.memory.embeddings import embed_texts
+from app.memory.vector_store import DUPLICATE_SHARED_FIELDS, VectorStore
+from app.observability.logging import get_logger
+
+log = get_logger("knowflow.indexing")
+
+_END = object()
+_POLL_S = 0.5
+
+
+# collect chunks across documents -> embed large batches -> upsert concurrently.
+# a key (usually a doc id) shows up in completed() once all its chunks are upserted.
+class IndexingPipeline:
+
+    def __init__(
+        self,
+        vs: VectorStore,
+        batch_size: int | None = None,
+        queue_size: int | None = None,
+        upsert_workers: int | None = None,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        dedup_threshold: float | None = None,
+    ):
+        self.vs = vs
+        self.batch_size = batch_size or settings.INDEX_BATCH_SIZE
+        queue_size = queue_size or settings.INDEX_QUEUE_SIZE
+        upsert_workers = upsert_workers or settings.INDEX_UPSERT_WORKERS
+        self.embed_fn = embed_fn or (
+            lambda texts: embed_texts(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+        )
+        # cosine similarity at which a chunk is folded into an existing point; 0 disables
+        if dedup_threshold is None:
+            dedup_threshold = settings.INDEX_DEDUP_SIMILARITY if settings.INDEX_DEDUP_ENABLED else 0.0
+        self.dedup_threshold = dedup_threshold
+
+        self._inbox: queue.Queue = queue.Queue(maxsize=self.batch_size * queue_size)
+        self._batches: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._done: queue.Queue = queue.Queue()
+
+        self._upsert_pool = ThreadPoolExecutor(
+            max_workers=upsert_workers,
+            thread_name_prefix="index-upsert",
+        )
+        self._upsert_slots = threading.BoundedSemaphore(upsert_workers * 2)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, int] = {}
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+        self.embedded = 0
+        self.upserted = 0
+        self.suppressed = 0
+
+        self._collector = threading.Thread(target=self._collect, name="index-collect", daemon=True)
+        self._embedder = threading.Thread(target=self._embed, name="index-embed", daemon=True)
+        self._collector.start()
+        self._embedder.start()
+
+    def submit(self, key: Hashable, chunks: List[Dict[str, Any]]) -> None:
+        self.raise_if_failed()
+        if not chunks:
+            self._done.put(key)
+            return
+
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + len(chunks)
+
+        for chunk in chunks:
+            self._put(self._inbox, (key, chunk))
+
+    def completed(self) -> List[Hashable]:
+        keys = []
+        while True:
+            try:
+                keys.append(self._done.get_nowait())
+            except queue.Empty:
+                return keys
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+
+        self._inbox.put(_END)
+        self._collector.join()
+        self._embedder.join()
+        self._upsert_pool.shutdown(wait=True)
+
+        log.info(
+            "indexing_pipeline_closed",
+            embedded=self.embedded,
+            upserted=self.upserted,
+            suppressed=self.suppressed,
+        )
+
+    def raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "IndexingPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close()
+        return False
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            self.raise_if_failed()
+            try:
+                q.put(item, timeout=_POLL_S)
+                return
+            except queue.Full:
+                continue
+
+    def _forward(self, q: queue.Queue, item: Any) -> None:
+        while self._error is None:
+            try:
+                q.put(item, timeout=_POLL_S)
+                return
+            except queue.Full:
+                continue
+
+    def _fail(self, exc: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = exc
+                log.error("indexing_pipeline_failed", error=str(exc))
+
+    def _collect(self) -> None:
+        buffer: List[Tuple[Hashable, Dict[str, Any]]] = []
+        while True:
+            try:
+                item = self._inbox.get(timeout=_POLL_S)
+            except queue.Empty:
+                if buffer:
+                    self._forward(self._batches, buffer)
+                    buffer = []
+                continue
+
+            if item is _END:
+                break
+            if self._error is not None:
+                continue
+
+            buffer.append(item)
+            if len(buffer) >= self.batch_size:
+                self._forward(self._batches, buffer)
+                buffer = []
+
+        if buffer:
+            self._forward(self._batches, buffer)
+        self._batches.put(_END)
+
+    def _embed(self) -> None:
+        while True:
+            batch = self._batches.get()
+            if batch is _END:
+                return
+            if self._error is not None:
+                continue
+
+            try:
+                vectors = self.embed_fn([chunk["text"] for _, chunk in batch])
+                self.embedded += len(batch)
+
+                self._upsert_slots.acquire()
+                self._upsert_pool.submit(self._upsert, batch, vectors)
+            except BaseException as exc:
+                self._fail(exc)
+
+    # split a batch into chunks to store and chunks that near-duplicate a stored
+    # point or an earlier chunk of the batch with the same year/source/content
+    # type. The latter are not stored; the canonical point gets a ref to them in
+    # payload["duplicates"], which doc-scoped filters also match (build_filter).
+    def _suppress_duplicates(
+        self,
+        batch: List[Tuple[Hashable, Dict[str, Any]]],
+        vectors: List[List[float]],
+    ) -> Tuple[List[int], Dict[str, List[Dict[str, Any]]]]:
+
+        canonical = self.vs.find_near_duplicates(
+            vectors,
+            [chunk["id"] for _, chunk in batch],
+            [chunk["metadata"] for _, chunk in batch],
+            self.dedup_threshold,
+        )
+
+        # embeddings are normalized, so the dot product is the cosine similarity
+        matrix = np.asarray(vectors, dtype=np.float32)
+        shared = [
+            tuple(chunk["metadata"].get(f) for f in DUPLICATE_SHARED_FIELDS) for _, chunk in batch
+        ]
+        kept: List[int] = []
+        for i, (_, chunk) in enumerate(batch):
+            candidates = [k for k in kept if shared[k] == shared[i]]
+            if canonical[i] is None and candidates:
+                sims = matrix[candidates] @ matrix[i]
+                best = int(np.argmax(sims))
+                if sims[best] >= self.dedup_threshold:
+                    canonical[i] = batch[candidates[best]][1]["id"]
+            if canonical[i] is None:
+                kept.append(i)
+
+        refs: Dict[str, List[Dict[str, Any]]] = {}
+        for (_, chunk), point_id in zip(batch, canonical):
+            if point_id is not None:
+                meta = chunk["metadata"]
+                refs.setdefault(point_id, []).append(
+                    {
+                        "point_id": chunk["id"],
+                        "doc_id": meta["doc_id"],
+                        "section": meta["section"],
+                        "chunk_id": meta["chunk_id"],
+                    }
+                )
+        return kept, refs
+
+    def _upsert(self, batch: List[Tuple[Hashable, Dict[str, Any]]], vectors: List[List[float]]) -> None:
+        try:
+            kept = list(range(len(batch)))
+            refs: Dict[str, List[Dict[str, Any]]] = {}
+            if self.dedup_threshold:
+                kept, refs = self._suppress_duplicates(batch, vectors)
+
+            self.vs.upsert_passages(
+                [batch[i][1]["text"] for i in kept],
+                [vectors[i] for i in kept],
+                [batch[i][1]["metadata"] for i in kept],
+                ids=[batch[i][1]["id"] for i in kept],
+            )
+            self.vs.add_duplicates(refs)
+
+            with self._lock:
+                self.upserted += len(kept)
+                self.suppressed += len(batch) - len(kept)
+                for key, _ in batch:
+                    self._pending[key] -= 1
+                    if self._pending[key] == 0:
+                        del self._pending[key]
+                        self._done.put(key)
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            self._upsert_slots.release()
@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.orm import Session, load_only
+
+from app.cleaning.text_cleaning import CLEANER_VERSION, clean_raw_text
+from app.config import settings
+from app.core.db import SessionLocal
+from app.external.pdf_cache import get_pdf_cache
+from app.external.pdf_sandbox import PdfWorkerPool
+from app.jobs.runner import JobContext
+from app.memory.document_store import iter_document_batches, needs_cleaning, needs_extraction
+from app.memory.models import Document, STAGE_CLEANED, STAGE_INDEXED
+from app.memory.vector_store import get_vector_store
+from app.observability.logging import get_logger
+from app.services.indexing_pipeline import IndexingPipeline
+from app.services.text_extraction_service import _extract_one, _write_results
+from app.services.vectorization_service import INDEX_COLUMNS, apply_document_index, plan_document_index
+
+log = get_logger("knowflow.ingestion")
+
+_END = object()
+_POLL_S = 0.5
+_INDEX_BATCH_SIZE = 50
+
+
+def _routing_query(db: Session):
+    return db.query(
+        Document.id,
+        Document.pdf_url,
+        needs_extraction().label("needs_extraction"),
+        needs_cleaning().label("needs_cleaning"),
+    )
+
+
+# extract -> clean -> index, each stage in its own thread with a bounded queue
+# in front of it. Documents enter at the first stage they still need, and every
+# stage writes its result (and the document's stage) before handing it on, so
+# a document is searchable as soon as it clears the index stage.
+class IngestionPipeline:
+
+    def __init__(
+        self,
+        extract_concurrency: int | None = None,
+        extract_workers: int | None = None,
+        clean_workers: int | None = None,
+        queue_size: int | None = None,
+    ):
+        self.extract_concurrency = extract_concurrency or settings.PDF_DOWNLOAD_CONCURRENCY
+        self.extract_workers = extract_workers or settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+        self.clean_workers = clean_workers or settings.CLEAN_WORKERS or os.cpu_count() or 1
+        queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+
+        self._extract_q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._clean_q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._index_q: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self._ended: set = set()
+        self._error: Optional[BaseException] = None
+        self._aborted = False
+        self._closed = False
+
+        self.stats: Dict[str, int] = {
+            "queued": 0,
+            "extracted": 0,
+            "extract_failed": 0,
+            "extract_skipped": 0,
+            "cleaned": 0,
+            "indexed": 0,
+            "chunks": 0,
+            "overflow": 0,
+        }
+
+        self._threads = [
+            threading.Thread(
+                target=self._stage,
+                args=(self._extract_q, self._clean_q, lambda: asyncio.run(self._extract())),
+                name="ingest-extract",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._stage,
+                args=(self._clean_q, self._index_q, self._clean),
+                name="ingest-clean",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._stage,
+                args=(self._index_q, None, self._index),
+                name="ingest-index",
+                daemon=True,
+            ),
+        ]
+        for t in self._threads:
+            t.start()
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    # rows from _routing_query. With a timeout, the first row that doesn't get a
+    # queue slot in time and every row after it that doesn't fit right away
+    # are skipped and counted as overflow; returns how many.
+    def feed(self, rows: Iterable[Any], timeout: float | None = None) -> int:
+        overflow = 0
+        for row in rows:
+            self.raise_if_failed()
+            if row.needs_extraction:
+                q, item = self._extract_q, (row.id, row.pdf_url)
+            elif row.needs_cleaning:
+                q, item = self._clean_q, (row.id, None)
+            else:
+                q, item = self._index_q, row.id
+            try:
+                q.put(item, block=not overflow, timeout=timeout)
+            except queue.Full:
+                overflow += 1
+                continue
+            self._count(queued=1)
+        if overflow:
+            self._count(overflow=overflow)
+        return overflow
+
+    # called from request handlers and the harvester, so it must not stall
+    # them behind a slow stage; overflow is left for the next backfill
+    def submit(self, doc_ids: List[int]) -> None:
+        with SessionLocal() as db:
+            rows = _routing_query(db).filter(Document.id.in_(doc_ids)).all()
+        overflow = self.feed(rows, timeout=settings.INGEST_SUBMIT_TIMEOUT_S)
+        if overflow:
+            log.warning("ingestion_queue_full", submitted=len(rows), overflow=overflow)
+
+    # abort drops whatever is still queued instead of processing it
+    def close(self, abort: bool = False) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._aborted = abort
+
+        self._extract_q.put(_END)
+        for t in self._threads:
+            t.join()
+
+        log.info("ingestion_pipeline_closed", aborted=abort, **self.stats)
+
+    def raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "IngestionPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.close(abort=exc_type is not None)
+        return False
+
+    def _count(self, **counters: int) -> None:
+        with self._lock:
+            for k, v in counters.items():
+                self.stats[k] += v
+
+    # runs one stage; if it dies, keep draining its queue so upstream never
+    # blocks, and always pass _END on so downstream stages finish too.
+    def _stage(self, inbox: queue.Queue, outbox: Optional[queue.Queue], body) -> None:
+        try:
+            body()
+        except BaseException as exc:
+            with self._lock:
+                if self._error is None:
+                    self._error = exc
+            log.exception("ingestion_stage_failed", stage=threading.current_thread().name)
+            if id(inbox) not in self._ended:
+                while inbox.get() is not _END:
+                    pass
+        finally:
+            if outbox is not None:
+                outbox.put(_END)
+
+    # up to max_items that are ready now; waits at most _POLL_S for the first.
+    def _take(self, q: queue.Queue, max_items: int) -> Tuple[List[Any], bool]:
+        items: List[Any] = []
+        try:
+            item = q.get(timeout=_POLL_S)
+        except queue.Empty:
+            return items, False
+
+        while True:
+            if item is _END:
+                self._ended.add(id(q))
+                return ([] if self._aborted else items), True
+            items.append(item)
+            if len(items) >= max_items:
+                break
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+
+        return ([] if self._aborted else items), False
+
+    async def _extract(self) -> None:
+        cache = get_pdf_cache()
+        download_slots = asyncio.Semaphore(self.extract_concurrency)
+        batch_size = settings.EXTRACTION_BATCH_SIZE
+        in_flight: set = set()
+        results: List[Tuple[int, Dict[str, str] | None, str | None]] = []
+        ended = False
+
+        db = SessionLocal()
+        try:
+            async with httpx.AsyncClient(
+                timeout=settings.PDF_DOWNLOAD_TIMEOUT_S,
+                limits=httpx.Limits(
+                    max_connections=self.extract_concurrency,
+                    max_keepalive_connections=self.extract_concurrency,
+                ),
+                follow_redirects=True,
+            ) as client:
+                with PdfWorkerPool(
+                    workers=self.extract_workers,
+                    timeout_s=settings.PDF_EXTRACT_TIMEOUT_S,
+                    max_rss_mb=settings.PDF_EXTRACT_MAX_RSS_MB,
+                    streaming=settings.PDF_EXTRACT_STREAMING,
+                ) as sandbox, ThreadPoolExecutor(max_workers=self.extract_workers) as dispatcher:
+                    while not ended or in_flight:
+                        idle = False
+                        if not ended and len(in_flight) < self.extract_concurrency * 2:
+                            items, ended = await asyncio.to_thread(
+                                self._take, self._extract_q, self.extract_concurrency
+                            )
+                            idle = not items
+                            for doc_id, pdf_url in items:
+                                in_flight.add(
+                                    asyncio.create_task(
+                                        _extract_one(
+                                            client, cache, sandbox, dispatcher,
+                                            download_slots, doc_id, pdf_url,
+                                        )
+                                    )
+                                )
+                        elif in_flight:
+                            await asyncio.wait(
+                                in_flight, timeout=_POLL_S, return_when=asyncio.FIRST_COMPLETED
+                            )
+
+                        done = {t for t in in_flight if t.done()}
+                        in_flight -= done
+                        results.extend(t.result() for t in done)
+
+                        # small writes while trickling (new papers), full batches during backfills
+                        if results and (len(results) >= batch_size or idle or ended):
+                            await asyncio.to_thread(self._write_extracted, db, results)
+                            results = []
+
+                    if results:
+                        await asyncio.to_thread(self._write_extracted, db, results)
+        finally:
+            db.close()
+
+    def _write_extracted(self, db: Session, results) -> None:
+        _write_results(db, results)
+
+        for doc_id, result, error in results:
+            if result:
+                self._count(extracted=1)
+                if "clean_text" in result:
+                    self._index_q.put(doc_id)
+                else:
+                    self._clean_q.put((doc_id, result["raw_text"]))
+            elif error:
+                # still worth indexing the title and abstract
+                self._count(extract_failed=1)
+                self._index_q.put(doc_id)
+            else:
+                # not in the cache (cache_only); title and abstract still go in
+                self._count(extract_skipped=1)
+                self._index_q.put(doc_id)
+
+    def _clean(self) -> None:
+        db = SessionLocal()
+        try:
+            # spawn, not fork: this is a thread of a long-lived server process
+            with ProcessPoolExecutor(
+                max_workers=self.clean_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                ended = False
+                while not ended:
+                    items, ended = self._take(self._clean_q, settings.CLEAN_BATCH_SIZE)
+                    if not items:
+                        continue
+
+                    texts = dict(items)
+                    missing = [doc_id for doc_id, text in texts.items() if text is None]
+                    if missing:
+                        loaded = db.query(Document.id, Document.raw_text).filter(Document.id.in_(missing))
+                        texts.update({doc_id: raw_text for doc_id, raw_text in loaded})
+
+                    doc_ids = list(texts)
+                    cleaned = pool.map(
+                        clean_raw_text,
+                        [texts[doc_id] or "" for doc_id in doc_ids],
+                        chunksize=max(1, len(doc_ids) // (self.clean_workers * 4)),
+                    )
+                    db.bulk_update_mappings(
+                        Document,
+                        [
+                            {
+                                "id": doc_id,
+                                "clean_text": text,
+                                "clean_version": CLEANER_VERSION,
+                                "stage": STAGE_CLEANED,
+                            }
+                            for doc_id, text in zip(doc_ids, cleaned)
+                        ],
+                    )
+                    db.commit()
+                    self._count(cleaned=len(doc_ids))
+
+                    for doc_id in doc_ids:
+                        self._index_q.put(doc_id)
+        finally:
+            db.close()
+
+    def _index(self) -> None:
+        db = SessionLocal()
+        vs = get_vector_store()
+        plans: Dict[int, Dict] = {}
+        # re-submitted while their previous plan is in flight (newer arXiv
+        # version, re-cleaned text); planned again once that one is applied
+        deferred: set = set()
+        ready: List[int] = []
+
+        def finalize(doc_ids: List[int]) -> None:
+            for doc_id in doc_ids:
+                apply_document_index(db, vs, doc_id, plans.pop(doc_id))
+                if doc_id in deferred:
+                    deferred.discard(doc_id)
+                    ready.append(doc_id)
+            if doc_ids:
+                db.commit()
+                self._count(indexed=len(doc_ids))
+
+        pipeline = IndexingPipeline(vs)
+        try:
+            ended = False
+            while not ended or (not self._aborted and (ready or deferred)):
+                if ended:
+                    # queue is done; wait for the plans the deferred documents are behind
+                    pipeline.raise_if_failed()
+                    items = []
+                    if not ready:
+                        time.sleep(_POLL_S)
+                else:
+                    items, ended = self._take(self._index_q, _INDEX_BATCH_SIZE)
+
+                doc_ids = []
+                for doc_id in set(items) | set(ready):
+                    if doc_id in plans:
+                        deferred.add(doc_id)
+                    else:
+                        doc_ids.append(doc_id)
+                ready.clear()
+                if doc_ids:
+                    docs = (
+                        db.query(Document)
+                        .options(load_only(*INDEX_COLUMNS))
+                        .filter(Document.id.in_(doc_ids))
+                        .all()
+                    )
+                    for doc in docs:
+                        plan = plan_document_index(db, vs, doc)
+                        pending = plan.pop("pending")
+                        plans[doc.id] = plan
+                        pipeline.submit(doc.id, pending)
+                        self._count(chunks=len(pending))
+                    db.commit()
+                    db.expunge_all()
+
+                finalize(pipeline.completed())
+        finally:
+            pipeline.close()
+            finalize(pipeline.completed())
+            db.close()
+
+        pipeline.raise_if_failed()
+
+
+# backfill: everything not yet indexed. The stage column is the checkpoint, so
+# a cancelled or failed run simply picks up the remaining documents next time.
+def run_ingestion(db: Session, limit: int | None = None, job: JobContext | None = None) -> Dict[str, int]:
+    query = _routing_query(db).filter(Document.stage != STAGE_INDEXED)
+
+    pipeline = IngestionPipeline()
+    aborted = True
+    try:
+        for rows in iter_document_batches(db, query, batch_size=settings.CLEAN_BATCH_SIZE, limit=limit):
+            pipeline.feed(rows)
+            if job is not None:
+                job.update(**pipeline.stats)
+                job.raise_if_cancelled()
+        aborted = False
+    finally:
+        pipeline.close(abort=aborted)
+
+    if job is not None:
+        job.update(**pipeline.stats)
+    pipeline.raise_if_failed()
+    return dict(pipeline.stats)
+
+
+_pipeline_singleton: Optional[IngestionPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+# long-lived pipeline the collector feeds newly saved documents into
+def get_ingestion_pipeline() -> IngestionPipeline:
+    global _pipeline_singleton
+    with _pipeline_lock:
+        if _pipeline_singleton is not None and _pipeline_singleton.failed:
+            _pipeline_singleton.close(abort=True)
+            _pipeline_singleton = None
+        if _pipeline_singleton is None:
+            _pipeline_singleton = IngestionPipeline()
+    return _pipeline_singleton
+
+
+def shutdown_ingestion_pipeline() -> None:
+    global _pipeline_singleton
+    with _pipeline_lock:
+        if _pipeline_singleton is not None:
+            _pipeline_singleton.close(abort=True)
+            _pipeline_singleton = None
@@ -16,11 +16,14 @@ adapt = AdaptationService()
 _graph = build_orchestrator_graph()
 
 
-def run_query(state_or_question) -> OrchestratorState:
+def _initial_state(state_or_question) -> OrchestratorState:
     if isinstance(state_or_question, OrchestratorState):
-        state = state_or_question
-    else:
-        state = OrchestratorState(question=str(state_or_question))
+        return state_or_question
+    return OrchestratorState(question=str(state_or_question))
+
+
+def run_query(state_or_question) -> OrchestratorState:
+    state = _initial_state(state_or_question)
 
     t0 = time.perf_counter()
 
@@ -32,3 +35,20 @@ def run_query(state_or_question) -> OrchestratorState:
         elapsed_ms = (time.perf_counter() - t0) * 1000.0
         log.info("run_query_done", latency_ms=round(elapsed_ms, 2))
         return out
+
+
+# same graph; retrieval awaits Qdrant on the loop, the other (sync) nodes run
+# in the executor
+async def arun_query(state_or_question) -> OrchestratorState:
+    state = _initial_state(state_or_question)
+
+    t0 = time.perf_counter()
+
+    with tracer.trace(name="run_query", metadata={"question": state.question}) as tr:
+        result = await _graph.ainvoke(state)
+
+        out = OrchestratorState(**result) if isinstance(result, dict) else result
+
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        log.info("run_query_done", latency_ms=round(elapsed_ms, 2))
+        return out
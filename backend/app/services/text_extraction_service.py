@@ -1,36 +1,217 @@
-from sqlalchemy.orm import Session
-from ..memory.document_store import Document
-from ..external.pdf_extractor import extract_text_from_pdf_url
+import asyncio
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
 
+import httpx
+from sqlalchemy.orm import Session, load_only
 
-def process_pdf_for_document(db: Session, doc: Document):
+from ..cleaning.text_cleaning import STREAMING_CLEANER_VERSION
+from ..config import settings
+from ..memory.document_store import Document, iter_document_batches
+from ..memory.models import STAGE_CLEANED, STAGE_EXTRACTED
+from ..external.pdf_cache import PdfCache, get_pdf_cache
+from ..external.pdf_extractor import download_pdf_async
+from ..external.pdf_sandbox import PdfWorkerPool
+from ..jobs.runner import JobContext
+from ..observability.logging import get_logger
 
-    if not doc.pdf_url:
-        return False
-    
-    text = extract_text_from_pdf_url(doc.pdf_url)
-    if not text:
-        return False
+log = get_logger("knowflow.extraction")
+
+ERROR_DOWNLOAD = "download_failed"
+
+
+async def _fetch_pdf(
+    client: httpx.AsyncClient,
+    cache: PdfCache | None,
+    download_slots: asyncio.Semaphore,
+    pdf_url: str,
+) -> Tuple[str | None, bytes | None]:
+
+    if cache is not None:
+        content_hash, pdf_bytes = await asyncio.to_thread(cache.get_pdf, pdf_url)
+        if pdf_bytes is not None:
+            return content_hash, pdf_bytes
+        if cache.cache_only:
+            return None, None
+
+    async with download_slots:
+        pdf_bytes = await download_pdf_async(client, pdf_url)
+    if not pdf_bytes:
+        return None, None
+
+    content_hash = None
+    if cache is not None:
+        content_hash = await asyncio.to_thread(cache.put_pdf, pdf_url, pdf_bytes)
+    return content_hash, pdf_bytes
 
-    doc.raw_text = text
-    db.add(doc)
-    db.commit()
-    return True
 
+async def _extract_one(
+    client: httpx.AsyncClient,
+    cache: PdfCache | None,
+    sandbox: PdfWorkerPool,
+    dispatcher: Executor,
+    download_slots: asyncio.Semaphore,
+    doc_id: int,
+    pdf_url: str,
+) -> Tuple[int, Dict[str, str] | None, str | None]:
 
-def process_all_documents(db: Session, limit: int = None):
+    content_hash, pdf_bytes = await _fetch_pdf(client, cache, download_slots, pdf_url)
+    if not pdf_bytes:
+        # a cache_only miss isn't the document's fault: no error, so a run
+        # that downloads picks it up
+        if cache is not None and cache.cache_only:
+            return doc_id, None, None
+        return doc_id, None, ERROR_DOWNLOAD
 
-    query = db.query(Document).filter(Document.raw_text == None)
+    cache_text = cache is not None and content_hash is not None and settings.PDF_CACHE_TEXT
+    if cache_text:
+        text = await asyncio.to_thread(cache.get_text, content_hash, sandbox.backend)
+        if text:
+            return doc_id, {"raw_text": text}, None
 
-    if limit:
-        query = query.limit(limit)
+    loop = asyncio.get_running_loop()
+    result, error = await loop.run_in_executor(dispatcher, sandbox.extract, pdf_bytes)
+    if result and cache_text:
+        await asyncio.to_thread(cache.put_text, content_hash, sandbox.backend, result["raw_text"])
+    return doc_id, result, error
 
-    docs = query.all()
 
+def _write_results(db: Session, results: List[Tuple[int, Dict[str, str] | None, str | None]]) -> int:
+    now = datetime.utcnow()
+    rows: List[Dict] = []
     processed = 0
-    for doc in docs:
-        ok = process_pdf_for_document(db, doc)
-        if ok:
+
+    for doc_id, result, error in results:
+        if result:
+            rows.append(
+                {
+                    "id": doc_id,
+                    "raw_text": result["raw_text"],
+                    "clean_text": result.get("clean_text"),
+                    "clean_version": STREAMING_CLEANER_VERSION if "clean_text" in result else None,
+                    "stage": STAGE_CLEANED if "clean_text" in result else STAGE_EXTRACTED,
+                    "extraction_error": None,
+                    "extraction_failed_at": None,
+                }
+            )
             processed += 1
+        elif error:
+            rows.append({"id": doc_id, "extraction_error": error, "extraction_failed_at": now})
+            log.warning("extraction_failed", doc_id=doc_id, error=error)
+
+    if rows:
+        db.bulk_update_mappings(Document, rows)
+    db.commit()
+    return processed
+
+
+async def _process_all_documents(
+    db: Session,
+    limit: int | None,
+    retry_failed: bool,
+    reextract: bool,
+    job: JobContext | None = None,
+) -> int:
 
+    batch_size = settings.EXTRACTION_BATCH_SIZE
+    concurrency = settings.PDF_DOWNLOAD_CONCURRENCY
+    workers = settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+    query = (
+        db.query(Document)
+        .options(load_only(Document.id, Document.pdf_url))
+        .filter(Document.pdf_url.isnot(None))
+    )
+    if not reextract:
+        query = query.filter(Document.raw_text == None)
+    if not retry_failed:
+        query = query.filter(Document.extraction_failed_at.is_(None))
+
+    cache = get_pdf_cache()
+    download_slots = asyncio.Semaphore(concurrency)
+    in_flight: set = set()
+    results: List[Tuple[int, Dict[str, str] | None, str | None]] = []
+    processed = 0
+
+    after_id = 0
+    if job is not None:
+        after_id = job.checkpoint.get("after_id", 0)
+        if limit is not None:
+            limit = max(0, limit - job.progress.get("attempted", 0))
+    task_docs: Dict[asyncio.Task, int] = {}
+    last_id = after_id
+
+    def write(batch) -> int:
+        n = _write_results(db, batch)
+        if job is not None:
+            # documents still in flight may finish after later ones, so the
+            # checkpoint only advances up to the oldest of them.
+            pending = [task_docs[t] for t in in_flight]
+            job.increment(processed=n, attempted=len(batch))
+            job.save_checkpoint(after_id=min(pending) - 1 if pending else last_id)
+            job.raise_if_cancelled()
+        return n
+
+    async with httpx.AsyncClient(
+        timeout=settings.PDF_DOWNLOAD_TIMEOUT_S,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        follow_redirects=True,
+    ) as client:
+        with PdfWorkerPool(
+            workers=workers,
+            timeout_s=settings.PDF_EXTRACT_TIMEOUT_S,
+            max_rss_mb=settings.PDF_EXTRACT_MAX_RSS_MB,
+            streaming=settings.PDF_EXTRACT_STREAMING,
+        ) as sandbox, ThreadPoolExecutor(max_workers=workers) as dispatcher:
+            batches = iter_document_batches(
+                db, query, batch_size=batch_size, limit=limit, after_id=after_id
+            )
+            for docs in batches:
+                for doc in docs:
+                    task = asyncio.create_task(
+                        _extract_one(
+                            client, cache, sandbox, dispatcher, download_slots, doc.id, doc.pdf_url
+                        )
+                    )
+                    task_docs[task] = doc.id
+                    in_flight.add(task)
+                last_id = docs[-1].id
+
+                while len(in_flight) >= batch_size:
+                    done, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    results.extend(t.result() for t in done)
+                    for t in done:
+                        task_docs.pop(t, None)
+
+                if len(results) >= batch_size:
+                    processed += write(results)
+                    results = []
+
+            if in_flight:
+                done, in_flight = await asyncio.wait(in_flight)
+                results.extend(t.result() for t in done)
+
+            processed += write(results)
+
+    log.info(
+        "extraction_done",
+        processed=processed,
+        workers=workers,
+        concurrency=concurrency,
+        respawned_workers=sandbox.respawned,
+    )
     return processed
+
+
+def process_all_documents(
+    db: Session,
+    limit: int = None,
+    retry_failed: bool = False,
+    reextract: bool = False,
+    job: JobContext | None = None,
+):
+    return asyncio.run(_process_all_documents(db, limit, retry_failed, reextract, job))
@@ -1,132 +1,257 @@
-from typing import List, Dict
-from sqlalchemy.orm import Session
+import hashlib
+import json
+from typing import List, Dict, Set
+from uuid import UUID, uuid5
 
-from app.memory.models import Document
-from app.memory.embeddings import embed_texts
-from app.memory.vector_store import VectorStore
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session, load_only
 
+from app.memory.models import Document, STAGE_CLEANED, STAGE_INDEXED
+from app.memory.document_store import iter_document_batches, needs_cleaning, needs_extraction
+from app.config import settings
+from app.jobs.runner import JobContext
+from app.memory.embedding_pool import EmbeddingPool
+from app.memory.embeddings import embed_texts, embedding_model_id
+from app.memory.vector_store import VectorStore, get_vector_store
+from app.services.chunking import iter_chunks
+from app.services.indexing_pipeline import IndexingPipeline
 
-def _chunk_text(
-    text: str,
-    max_chars: int = 800,
-    overlap: int = 200,
-) -> List[Dict]:
 
-    chunks: List[Dict] = []
-    start = 0
-    idx = 0
+POINT_ID_NAMESPACE = UUID("6f0b8a52-3c1e-5d7a-9b64-2e8f41c0d9a3")
+
+# what plan_document_index reads from a document
+INDEX_COLUMNS = (
+    Document.id,
+    Document.title,
+    Document.abstract,
+    Document.clean_text,
+    Document.source,
+    Document.year,
+    Document.content_type,
+    Document.url,
+    Document.index_manifest,
+    Document.stage,
+)
+
+
+def _chunk_text(text: str) -> List[Dict]:
+    return list(iter_chunks(text))
+
 
-    if not text:
-        return chunks
+def _document_chunks(doc: Document) -> List[Dict]:
 
-    text = text.strip()
-    if not text:
-        return chunks
+    base = {
+        "doc_id": doc.id,
+        "title": doc.title,
+        "source": doc.source,
+        "year": doc.year,
+        "content_type": doc.content_type,
+        "url": doc.url,
+        "embedding_model": embedding_model_id(),
+    }
 
-    while start < len(text):
-        end = start + max_chars
-        chunk = text[start:end]
-        if chunk.strip():
+    sections: List[tuple] = []
+    if doc.title:
+        sections.append(("title", [{"chunk_id": 0, "text": doc.title.strip()}]))
+    if doc.abstract:
+        sections.append(("abstract", _chunk_text(doc.abstract)))
+    if doc.clean_text:
+        sections.append(("body", _chunk_text(doc.clean_text)))
+
+    chunks: List[Dict] = []
+    for section, section_chunks in sections:
+        for c in section_chunks:
+            metadata = {**base, "chunk_id": c["chunk_id"], "section": section}
+            content_hash = _content_hash(c["text"], metadata)
+            metadata["content_hash"] = content_hash
             chunks.append(
                 {
-                    "chunk_id": idx,
-                    "text": chunk.strip(),
+                    "id": _point_id(doc.id, section, c["chunk_id"], content_hash),
+                    "text": c["text"],
+                    "metadata": metadata,
                 }
             )
-            idx += 1
 
+    return chunks
 
-        start = end - overlap
-        if start < 0:
-            start = 0
 
-    return chunks
+def _content_hash(text: str, metadata: Dict) -> str:
+    h = hashlib.sha256()
+    h.update(text.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def _point_id(doc_id: int, section: str, chunk_id: int, content_hash: str) -> str:
+    return str(uuid5(POINT_ID_NAMESPACE, f"{doc_id}:{section}:{chunk_id}:{content_hash}"))
+
+
+def plan_document_index(
+    db: Session,
+    vs: VectorStore,
+    doc: Document,
+    force: bool = False,
+) -> Dict:
+
+    chunks = _document_chunks(doc)
+    previous: Dict[str, str] = dict(doc.index_manifest or {})
+
+    if doc.index_manifest is None:
+        # whatever is stored for it may be canonical for other documents' chunks
+        _release_duplicates(db, vs, doc.id, vs.document_point_ids(doc.id))
+        vs.delete_document(doc.id)
+
+    if force:
+        pending = chunks
+    else:
+        pending = [c for c in chunks if c["id"] not in previous]
+
+    manifest = {c["id"]: c["metadata"]["content_hash"] for c in chunks}
+
+    return {
+        "pending": pending,
+        "manifest": manifest,
+        "stale": [pid for pid in previous if pid not in manifest],
+        "changed": manifest != previous or doc.index_manifest is None,
+        "mark_indexed": doc.stage != STAGE_INDEXED,
+    }
+
+
+def apply_document_index(
+    db: Session,
+    vs: VectorStore,
+    doc_id: int,
+    plan: Dict,
+) -> None:
+
+    values = {}
+    if plan["stale"]:
+        orphaned = _release_duplicates(db, vs, doc_id, plan["stale"])
+        if orphaned:
+            plan["manifest"] = {pid: h for pid, h in plan["manifest"].items() if pid not in orphaned}
+            plan["changed"] = True
+            plan["mark_indexed"] = False
+            values[Document.stage] = STAGE_CLEANED
+        vs.delete_points(plan["stale"])
+
+    if plan["changed"]:
+        values[Document.index_manifest] = plan["manifest"]
+    if plan.get("mark_indexed"):
+        # a document indexed before its text was extracted/cleaned stays pending
+        values[Document.stage] = case(
+            (or_(needs_extraction(), needs_cleaning()), Document.stage),
+            else_=STAGE_INDEXED,
+        )
+
+    if values:
+        (
+            db.query(Document)
+            .filter(Document.id == doc_id)
+            .update(values, synchronize_session=False)
+        )
+
+
+# stale points can be canonical for suppressed chunks. Those chunks lose their
+# manifest entry and their document goes back to pending, so the next run
+# embeds them again. Returns the ids orphaned in doc_id itself.
+def _release_duplicates(
+    db: Session,
+    vs: VectorStore,
+    doc_id: int,
+    stale: List[str],
+) -> Set[str]:
+
+    vs.remove_duplicate_refs(stale)
+
+    gone = set(stale)
+    orphans: Dict[int, Set[str]] = {}
+    for ref in vs.get_duplicates(stale):
+        if ref["point_id"] not in gone:
+            orphans.setdefault(ref["doc_id"], set()).add(ref["point_id"])
+
+    own = orphans.pop(doc_id, set())
+    if orphans:
+        docs = (
+            db.query(Document)
+            .options(load_only(Document.id, Document.index_manifest, Document.stage))
+            .filter(Document.id.in_(orphans))
+        )
+        for doc in docs:
+            manifest = doc.index_manifest or {}
+            doc.index_manifest = {pid: h for pid, h in manifest.items() if pid not in orphans[doc.id]}
+            if doc.stage == STAGE_INDEXED:
+                doc.stage = STAGE_CLEANED
+        db.flush()
+    return own
 
 
 def vectorize_all_documents(
     db: Session,
     limit: int | None = None,
+    force: bool = False,
+    embedding_workers: int | None = None,
+    job: JobContext | None = None,
 ) -> int:
 
-    query = db.query(Document)
-    if limit:
-        query = query.limit(limit)
+    query = db.query(Document).options(load_only(*INDEX_COLUMNS))
 
-    docs: List[Document] = query.all()
-
-    vs = VectorStore()
+    vs = get_vector_store()
+    plans: Dict[int, Dict] = {}
     total_chunks = 0
 
-    for doc in docs:
-
-        if doc.title:
-            title_texts = [doc.title.strip()]
-            title_embeddings = embed_texts(title_texts)
-
-            title_metadatas: List[Dict] = [{
-                "doc_id": doc.id,
-                "title": doc.title,
-                "source": doc.source,
-                "year": doc.year,
-                "chunk_id": 0,
-                "section": "title",
-                "content_type": doc.content_type,
-                "url": doc.url,
-            }]
-
-            vs.upsert_passages(title_texts, title_embeddings, title_metadatas)
-            total_chunks += 1
-
-        if doc.abstract:
-            abstract_chunks = _chunk_text(doc.abstract, max_chars=800, overlap=200)
-            if abstract_chunks:
-                abstract_texts = [c["text"] for c in abstract_chunks]
-                abstract_embeddings = embed_texts(abstract_texts)
-
-                abstract_metadatas: List[Dict] = []
-                for c in abstract_chunks:
-                    abstract_metadatas.append(
-                        {
-                            "doc_id": doc.id,
-                            "title": doc.title,
-                            "source": doc.source,
-                            "year": doc.year,
-                            "chunk_id": c["chunk_id"],
-                            "section": "abstract",
-                            "content_type": doc.content_type,
-                            "url": doc.url,
-                        }
-                    )
-
-                vs.upsert_passages(
-                    abstract_texts,
-                    abstract_embeddings,
-                    abstract_metadatas,
-                )
-                total_chunks += len(abstract_chunks)
-
-        if doc.clean_text:
-            body_chunks = _chunk_text(doc.clean_text, max_chars=800, overlap=200)
-            if body_chunks:
-                body_texts = [c["text"] for c in body_chunks]
-                body_embeddings = embed_texts(body_texts)
-
-                body_metadatas: List[Dict] = []
-                for c in body_chunks:
-                    body_metadatas.append(
-                        {
-                            "doc_id": doc.id,
-                            "title": doc.title,
-                            "source": doc.source,
-                            "year": doc.year,
-                            "chunk_id": c["chunk_id"],
-                            "section": "body",
-                            "content_type": doc.content_type,
-                            "url": doc.url,
-                        }
-                    )
-
-                vs.upsert_passages(body_texts, body_embeddings, body_metadatas)
-                total_chunks += len(body_chunks)
+    after_id = 0
+    if job is not None:
+        after_id = job.checkpoint.get("after_id", 0)
+        if limit is not None:
+            limit = max(0, limit - job.progress.get("documents", 0))
+    last_id = after_id
+
+    def finalize(doc_ids: List[int]):
+        for doc_id in doc_ids:
+            apply_document_index(db, vs, doc_id, plans.pop(doc_id))
+
+        if job is not None and doc_ids:
+            db.commit()
+            job.increment(documents=len(doc_ids))
+            # documents still in the pipeline are older than last_id; stop short of them
+            job.save_checkpoint(after_id=min(plans) - 1 if plans else last_id)
+
+    workers = settings.EMBEDDING_WORKERS if embedding_workers is None else embedding_workers
+    pool = EmbeddingPool(workers) if workers > 1 else None
+    embed_fn = None
+    if pool is not None:
+        embed_fn = lambda texts: embed_texts(
+            texts,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            encode_fn=pool.encode,
+        )
+
+    pipeline = IndexingPipeline(vs, embed_fn=embed_fn)
+    try:
+        batches = iter_document_batches(db, query, batch_size=50, limit=limit, after_id=after_id)
+        for docs in batches:
+            batch_chunks = 0
+            for doc in docs:
+                plan = plan_document_index(db, vs, doc, force=force)
+                pending = plan.pop("pending")
+                plans[doc.id] = plan
+                pipeline.submit(doc.id, pending)
+                batch_chunks += len(pending)
+            total_chunks += batch_chunks
+            last_id = docs[-1].id
+
+            if job is not None:
+                job.increment(chunks=batch_chunks)
+            finalize(pipeline.completed())
+            if job is not None:
+                job.raise_if_cancelled()
+    finally:
+        pipeline.close()
+        if pool is not None:
+            pool.close()
+        finalize(pipeline.completed())
+        db.commit()
 
+    pipeline.raise_if_failed()
     return total_chunks
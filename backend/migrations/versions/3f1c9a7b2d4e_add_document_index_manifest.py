@@ -0,0 +1,28 @@
+"""add document index manifest
+
+Revision ID: 3f1c9a7b2d4e
+Revises: aca86d5bd7e8
+Create Date: 2026-01-12 10:14:02.531877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7b2d4e'
+down_revision: Union[str, Sequence[str], None] = 'aca86d5bd7e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('index_manifest', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'index_manifest')
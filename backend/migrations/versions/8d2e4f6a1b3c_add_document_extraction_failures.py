@@ -0,0 +1,30 @@
+"""add document extraction failures
+
+Revision ID: 8d2e4f6a1b3c
+Revises: 3f1c9a7b2d4e
+Create Date: 2026-01-19 16:42:11.208415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4f6a1b3c'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7b2d4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('extraction_error', sa.String(), nullable=True))
+    op.add_column('documents', sa.Column('extraction_failed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('documents', 'extraction_failed_at')
+    op.drop_column('documents', 'extraction_error')
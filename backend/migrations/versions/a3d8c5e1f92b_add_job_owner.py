@@ -0,0 +1,30 @@
+"""add job owner
+
+Revision ID: a3d8c5e1f92b
+Revises: f7b3d2a9c186
+Create Date: 2026-03-02 14:12:05.318840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8c5e1f92b'
+down_revision: Union[str, Sequence[str], None] = 'f7b3d2a9c186'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'owner')
@@ -0,0 +1,30 @@
+"""add document clean version
+
+Revision ID: b7c3e1d9f204
+Revises: 8d2e4f6a1b3c
+Create Date: 2026-01-27 09:31:48.774120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c3e1d9f204'
+down_revision: Union[str, Sequence[str], None] = '8d2e4f6a1b3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('clean_version', sa.String(), nullable=True))
+    op.create_index(op.f('ix_documents_clean_version'), 'documents', ['clean_version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_documents_clean_version'), table_name='documents')
+    op.drop_column('documents', 'clean_version')
@@ -0,0 +1,42 @@
+"""add document stage
+
+Revision ID: d5f1b8c3a6e0
+Revises: c4a9e2f7d815
+Create Date: 2026-02-10 11:47:22.905163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f1b8c3a6e0'
+down_revision: Union[str, Sequence[str], None] = 'c4a9e2f7d815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('stage', sa.String(), server_default='new', nullable=False))
+    op.execute(
+        """
+        UPDATE documents SET stage = CASE
+            WHEN index_manifest IS NOT NULL THEN 'indexed'
+            WHEN clean_text IS NOT NULL THEN 'cleaned'
+            WHEN raw_text IS NOT NULL THEN 'extracted'
+            ELSE 'new'
+        END
+        """
+    )
+    op.create_index('ix_documents_stage_pending', 'documents', ['id'], unique=False, postgresql_where=sa.text("stage <> 'indexed'"))
+    op.create_index('ix_documents_raw_text_missing', 'documents', ['id'], unique=False, postgresql_where=sa.text('raw_text IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_raw_text_missing', table_name='documents', postgresql_where=sa.text('raw_text IS NULL'))
+    op.drop_index('ix_documents_stage_pending', table_name='documents', postgresql_where=sa.text("stage <> 'indexed'"))
+    op.drop_column('documents', 'stage')
@@ -0,0 +1,48 @@
+"""add document dedup index
+
+Revision ID: e2a7c9d4f031
+Revises: d5f1b8c3a6e0
+Create Date: 2026-02-17 16:05:39.441207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c9d4f031'
+down_revision: Union[str, Sequence[str], None] = 'd5f1b8c3a6e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('norm_title', sa.String(), nullable=True))
+    op.add_column('documents', sa.Column('arxiv_id', sa.String(), nullable=True))
+    op.add_column('documents', sa.Column('arxiv_version', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('minhash', sa.LargeBinary(), nullable=True))
+    op.create_index(op.f('ix_documents_norm_title'), 'documents', ['norm_title'], unique=False)
+    op.create_index(op.f('ix_documents_arxiv_id'), 'documents', ['arxiv_id'], unique=False)
+
+    op.create_table('document_lsh_bands',
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('doc_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['doc_id'], ['documents.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('bucket', 'doc_id')
+    )
+    op.create_index(op.f('ix_document_lsh_bands_doc_id'), 'document_lsh_bands', ['doc_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_document_lsh_bands_doc_id'), table_name='document_lsh_bands')
+    op.drop_table('document_lsh_bands')
+    op.drop_index(op.f('ix_documents_arxiv_id'), table_name='documents')
+    op.drop_index(op.f('ix_documents_norm_title'), table_name='documents')
+    op.drop_column('documents', 'minhash')
+    op.drop_column('documents', 'arxiv_version')
+    op.drop_column('documents', 'arxiv_id')
+    op.drop_column('documents', 'norm_title')
@@ -0,0 +1,39 @@
+"""add harvest cursors
+
+Revision ID: f7b3d2a9c186
+Revises: e2a7c9d4f031
+Create Date: 2026-02-20 10:41:17.902356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b3d2a9c186'
+down_revision: Union[str, Sequence[str], None] = 'e2a7c9d4f031'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('harvest_cursors',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('query', sa.Text(), nullable=False),
+    sa.Column('next_start', sa.Integer(), nullable=False),
+    sa.Column('total_results', sa.Integer(), nullable=True),
+    sa.Column('harvested', sa.Integer(), nullable=False),
+    sa.Column('last_published_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('harvest_cursors')
@@ -0,0 +1,115 @@
+# Local stand-in for the arXiv query API, for running the harvester offline.
+#
+# Serves a fixed set of Atom entries, paged by ?start=&max_results= with
+# opensearch:totalResults, like export.arxiv.org/api/query. Entries come from a
+# saved feed (--feed, e.g. a page downloaded from arXiv) or are generated.
+#
+#   python -m scripts.arxiv_fixture_server --entries 2000 --delay 0.5
+#   python -m scripts.harvest_arxiv --api-url http://127.0.0.1:8765/api/query --interval 0
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+_WORDS = (
+    "retrieval augmented generation language model graph transformer attention "
+    "agent reasoning benchmark embedding contrastive sparse dense memory planning "
+    "evaluation alignment distillation multimodal representation token"
+).split()
+
+
+def generated_entries(count: int) -> List[str]:
+    entries = []
+    for i in range(count):
+        arxiv_id = f"2401.{i + 1:05d}"
+        words = [_WORDS[(i * 7 + k * 3) % len(_WORDS)] for k in range(60)]
+        day = 1 + i % 28
+        entries.append(
+            f"""<entry>
+  <id>http://arxiv.org/abs/{arxiv_id}v1</id>
+  <published>2024-01-{day:02d}T12:00:00Z</published>
+  <updated>2024-01-{day:02d}T12:00:00Z</updated>
+  <title>Fixture paper {i + 1}: {" ".join(words[:6])}</title>
+  <summary>Paper {i + 1}. {" ".join(words)}</summary>
+  <author><name>Author {i % 50}</name></author>
+  <author><name>Author {(i + 1) % 50}</name></author>
+  <link href="http://arxiv.org/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>
+  <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>
+</entry>"""
+        )
+    return entries
+
+
+def feed_entries(path: str) -> List[str]:
+    ET.register_namespace("", ATOM_NS)
+    root = ET.parse(path).getroot()
+    return [ET.tostring(e, encoding="unicode") for e in root.findall(f"{{{ATOM_NS}}}entry")]
+
+
+def make_handler(entries: List[str], delay: float):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/api/query":
+                self.send_error(404)
+                return
+
+            params = parse_qs(url.query)
+            start = int(params.get("start", ["0"])[0])
+            max_results = int(params.get("max_results", ["10"])[0])
+            page = entries[start:start + max_results]
+
+            body = (
+                '<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<feed xmlns="{ATOM_NS}" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+                f"<title>{escape(params.get('search_query', [''])[0])}</title>\n"
+                f"<opensearch:totalResults>{len(entries)}</opensearch:totalResults>\n"
+                f"<opensearch:startIndex>{start}</opensearch:startIndex>\n"
+                f"<opensearch:itemsPerPage>{len(page)}</opensearch:itemsPerPage>\n"
+                + "\n".join(page)
+                + "\n</feed>\n"
+            ).encode("utf-8")
+
+            if delay:
+                time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            print(f"{self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--feed", help="Atom feed to serve instead of generated entries")
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds per response")
+    args = parser.parse_args()
+
+    entries = feed_entries(args.feed) if args.feed else generated_entries(args.entries)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(entries, args.delay))
+    print(f"serving {len(entries)} entries on http://{args.host}:{args.port}/api/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Compare the PDF text backends (app.external.pdf_extractor.PDF_BACKENDS) on
+# stored PDFs: pages/s, peak RSS, and how close the cleaned text is to the
+# first backend's (rapidfuzz ratio of clean_raw_text outputs, 1.0 = identical).
+#
+# Each backend runs in its own fresh process so peak memory is its own.
+#
+#   python -m scripts.bench_pdf_backends                          # PDFs in the PDF cache
+#   python -m scripts.bench_pdf_backends --dir papers/ --limit 50 --backends pdfminer,pdfium
+import argparse
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+from rapidfuzz import fuzz
+
+from app.cleaning.text_cleaning import clean_raw_text
+from app.config import settings
+from app.external.pdf_extractor import PDF_BACKENDS, iter_pdf_pages
+
+
+def _find_pdfs(path: str, limit: int) -> List[str]:
+    paths = []
+    for dirpath, _, filenames in os.walk(path):
+        for name in sorted(filenames):
+            if name.endswith(".pdf"):
+                paths.append(os.path.join(dirpath, name))
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# runs in the child: (per-PDF (pages, seconds, cleaned text or None, error), baseline MB, peak MB)
+def _run_backend(backend: str, paths: List[str]) -> Tuple[List[Tuple[int, float, Optional[str], Optional[str]]], float, float]:
+    baseline = _peak_rss_mb()
+    results = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+
+        t0 = time.perf_counter()
+        try:
+            pages = list(iter_pdf_pages(pdf_bytes, backend))
+        except Exception as exc:
+            results.append((0, time.perf_counter() - t0, None, f"{type(exc).__name__}: {exc}"))
+            continue
+        seconds = time.perf_counter() - t0
+        results.append((len(pages), seconds, clean_raw_text("".join(pages).strip()), None))
+    return results, baseline, _peak_rss_mb()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=os.path.join(settings.PDF_CACHE_DIR, "blobs"))
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--backends", default=",".join(PDF_BACKENDS))
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in PDF_BACKENDS]
+    if unknown:
+        print(f"unknown backends: {', '.join(unknown)} (have {', '.join(PDF_BACKENDS)})")
+        return 1
+
+    paths = _find_pdfs(args.dir, args.limit)
+    if not paths:
+        print(f"no PDFs under {args.dir}; run /api/extract-text with the PDF cache on or pass --dir")
+        return 1
+
+    runs: Dict[str, Tuple] = {}
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            runs[backend] = pool.submit(_run_backend, backend, paths).result()
+
+    mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+    reference = backends[0]
+    ref_texts = [text for _, _, text, _ in runs[reference][0]]
+
+    print(f"documents: {len(paths)} ({mb:.1f} MB), similarity against {reference}")
+    print(f"{'backend':<10} {'pages':>7} {'seconds':>8} {'pages/s':>8} {'peak MB':>8} {'+MB':>6} {'errors':>6} {'sim mean':>8} {'sim min':>8}")
+    for backend in backends:
+        results, baseline, peak = runs[backend]
+        pages = sum(r[0] for r in results)
+        seconds = sum(r[1] for r in results)
+        errors = sum(r[3] is not None for r in results)
+
+        scored = sorted(
+            (fuzz.ratio(text, ref) / 100, path)
+            for (_, _, text, _), ref, path in zip(results, ref_texts, paths)
+            if text is not None and ref is not None
+        )
+        sim_mean = sum(s for s, _ in scored) / len(scored) if scored else float("nan")
+        sim_min = scored[0][0] if scored else float("nan")
+
+        print(
+            f"{backend:<10} {pages:>7} {seconds:>8.2f} {pages / seconds if seconds else 0:>8.1f} "
+            f"{peak:>8.0f} {peak - baseline:>6.0f} {errors:>6} {sim_mean:>8.3f} {sim_min:>8.3f}"
+        )
+        if backend != reference:
+            for sim, path in scored[:3]:
+                print(f"    {sim:.3f}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
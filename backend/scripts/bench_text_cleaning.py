@@ -0,0 +1,229 @@
+# Throughput benchmark for app.cleaning.text_cleaning.clean_raw_text.
+#
+# Runs the current cleaner and the previous regex-per-line implementation (kept
+# below as the reference) over real extractions and checks the output is identical.
+#
+#   python -m scripts.bench_text_cleaning                       # texts cached by extraction
+#   python -m scripts.bench_text_cleaning --from-db --limit 500 # documents.raw_text
+#   python -m scripts.bench_text_cleaning --dir path/to/txts
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import List
+
+from app.cleaning.text_cleaning import clean_raw_text
+
+_LEGACY_MIN_REPEAT = 3
+_LEGACY_MIN_LEN = 25
+
+
+def legacy_normalize_newlines(text: str) -> str:
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def legacy_remove_pdf_artifacts(text: str) -> str:
+
+    text = text.replace("\x00", " ")
+
+    text = re.sub(r"\(cid:[0-9]+\)", " ", text)
+
+    text = text.replace("ˆ", "")
+
+    text = re.sub(r"[ \t]+", " ", text)
+
+    return text
+
+
+def legacy_remove_obvious_noise_lines(lines: List[str]) -> List[str]:
+    cleaned = []
+    for line in lines:
+        s = line.strip()
+        if not s:
+            cleaned.append("")
+            continue
+
+        if len(s) <= 3 and re.fullmatch(r"[0-9\W]+", s):
+            continue
+
+        if len(s) <= 2 and s.isalpha():
+            continue
+
+        letters = sum(ch.isalpha() for ch in s)
+
+        if re.fullmatch(r"([A-Za-z]\s+){1,}[A-Za-z]", s):
+            continue
+
+        if s.count(" ") > letters and letters < 10:
+            continue
+
+        if letters / max(len(s), 1) < 0.25 and len(s) < 40:
+            continue
+
+        chunks = re.split(r"\s{2,}", s)
+        if len(chunks) >= 3 and not re.search(r"[\.!?;:]", s):
+            continue
+
+        math_symbols = "=+-−*/<>≤≥∑∏∫()[]{}_^%|,:;"
+        math_like = sum(ch.isdigit() or ch in math_symbols for ch in s)
+
+        if len(s) < 15 and math_like > 0 and not re.search(r"[\.!?]", s):
+            continue
+
+        if math_like > 0 and math_like / len(s) > 0.4 and not re.search(r"[\.!?]", s):
+            continue
+
+        cleaned.append(s)
+
+    return cleaned
+
+
+def legacy_remove_repeated_headers(lines: List[str]) -> List[str]:
+    freq = Counter(lines)
+    seen = set()
+    out = []
+
+    for line in lines:
+        s = line.strip()
+        if not s:
+            out.append("")
+            continue
+
+        if (
+            freq[s] >= _LEGACY_MIN_REPEAT
+            and len(s) >= _LEGACY_MIN_LEN
+            and s.upper() == s  
+        ):
+            if s in seen:
+                continue
+            seen.add(s)
+
+        out.append(s)
+
+    return out
+
+
+def legacy_merge_lines_into_paragraphs(lines: List[str]) -> str:
+
+    paragraphs: List[str] = []
+    buffer: List[str] = []
+
+    def flush_buffer():
+        if not buffer:
+            return
+        paragraphs.append(" ".join(buffer))
+        buffer.clear()
+
+    for line in lines:
+        s = line.strip()
+        if not s:
+            flush_buffer()
+            continue
+
+        if buffer:
+            prev = buffer[-1]
+            if prev.endswith("-") and not prev.endswith("--"):
+                buffer[-1] = prev[:-1] + s
+            else:
+                buffer.append(s)
+        else:
+            buffer.append(s)
+
+    flush_buffer()
+    paragraphs = [re.sub(r"\s+", " ", p).strip() for p in paragraphs if p.strip()]
+
+    return "\n\n".join(paragraphs)
+
+
+def legacy_clean_raw_text(raw_text: str) -> str:
+
+    if not raw_text:
+        return ""
+
+    text = legacy_normalize_newlines(raw_text)
+
+    text = legacy_remove_pdf_artifacts(text)
+
+    lines = text.split("\n")
+
+    lines = legacy_remove_obvious_noise_lines(lines)
+
+    lines = legacy_remove_repeated_headers(lines)
+
+    cleaned = legacy_merge_lines_into_paragraphs(lines)
+
+    return cleaned.strip()
+
+
+def _load_from_dir(path: str, limit: int) -> List[str]:
+    texts = []
+    for dirpath, _, filenames in os.walk(path):
+        for name in sorted(filenames):
+            if not name.endswith(".txt"):
+                continue
+            with open(os.path.join(dirpath, name), "r", encoding="utf-8", errors="replace") as f:
+                texts.append(f.read())
+            if len(texts) >= limit:
+                return texts
+    return texts
+
+
+def _load_from_db(limit: int) -> List[str]:
+    from app.core.db import SessionLocal
+    from app.memory.models import Document
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Document.raw_text)
+            .filter(Document.raw_text.isnot(None))
+            .order_by(Document.id)
+            .limit(limit)
+            .all()
+        )
+        return [r[0] for r in rows]
+    finally:
+        db.close()
+
+
+def _time(fn, texts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=os.path.join("data", "pdf_cache", "text"))
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = _load_from_db(args.limit) if args.from_db else _load_from_dir(args.dir, args.limit)
+    if not texts:
+        print("no raw texts found; run /api/extract-text first or pass --dir/--from-db")
+        return 1
+
+    mismatches = sum(legacy_clean_raw_text(t) != clean_raw_text(t) for t in texts)
+
+    mb = sum(len(t.encode("utf-8")) for t in texts) / (1024 * 1024)
+    legacy_s = _time(legacy_clean_raw_text, texts, args.repeat)
+    current_s = _time(clean_raw_text, texts, args.repeat)
+
+    print(f"documents:      {len(texts)} ({mb:.1f} MB)")
+    print(f"legacy cleaner: {legacy_s:.2f}s  {mb / legacy_s:.2f} MB/s")
+    print(f"current:        {current_s:.2f}s  {mb / current_s:.2f} MB/s")
+    print(f"speedup:        {legacy_s / current_s:.2f}x")
+    print(f"mismatches:     {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# Recall/latency trade-off of the passage collection as it is configured
+# (QDRANT_HNSW_*, QDRANT_QUANTIZATION*, QDRANT_ON_DISK_VECTORS): top-k from an
+# exact full scan on the original vectors is the ground truth, and each
+# search-time hnsw_ef (with and without rescoring when quantized) is scored by
+# recall@k and per-query latency.
+#
+# Queries are random stored passages (their own point left out of both result
+# lists) or, with --queries-file, one query text per line.
+#
+#   python -m scripts.bench_vector_search
+#   python -m scripts.bench_vector_search --queries 500 --top-k 10 --ef 16,32,64,128,256
+#   python -m scripts.bench_vector_search --queries-file queries.txt --filter '{"year": {"gte": 2023}}'
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from qdrant_client.models import Sample, SampleQuery
+
+from app.config import settings
+from app.memory.embeddings import VECTOR_SIZE, embed_texts
+from app.memory.vector_store import DEFAULT_COLLECTION, build_filter, get_qdrant_client, search_params
+
+
+def _sample_queries(client, collection: str, n: int) -> List[Tuple[Optional[str], List[float]]]:
+    response = client.query_points(
+        collection_name=collection,
+        query=SampleQuery(sample=Sample.RANDOM),
+        limit=n,
+        with_payload=False,
+        with_vectors=True,
+    )
+    return [(str(p.id), p.vector) for p in response.points]
+
+
+def _file_queries(path: str, n: int) -> List[Tuple[Optional[str], List[float]]]:
+    with open(path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()][:n]
+    return [(None, emb) for emb in embed_texts(texts)]
+
+
+# (ids of the top_k hits without the query's own point, seconds)
+def _run(client, collection, query_filter, params, queries, top_k) -> List[Tuple[List[str], float]]:
+    runs = []
+    for own_id, vector in queries:
+        t0 = time.perf_counter()
+        response = client.query_points(
+            collection_name=collection,
+            query=vector,
+            query_filter=query_filter,
+            search_params=params,
+            limit=top_k + 1,
+            with_payload=False,
+        )
+        seconds = time.perf_counter() - t0
+        ids = [str(p.id) for p in response.points if str(p.id) != own_id][:top_k]
+        runs.append((ids, seconds))
+    return runs
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _vector_mb(points: int) -> Dict[str, float]:
+    full = points * VECTOR_SIZE * 4 / (1024 * 1024)
+    return {"none": full, "scalar": full / 4, "binary": full / 32}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--queries-file")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef", default="16,32,64,128,256")
+    parser.add_argument("--filter", help="retrieval filter as JSON, see build_filter")
+    args = parser.parse_args()
+
+    try:
+        filter_by: Optional[Dict[str, Any]] = json.loads(args.filter) if args.filter else None
+        query_filter = build_filter(filter_by)
+    except ValueError as exc:
+        print(f"bad --filter: {exc}")
+        return 1
+    ef_values = [int(e) for e in args.ef.split(",") if e.strip()]
+
+    client = get_qdrant_client()
+    info = client.get_collection(args.collection)
+    points = info.points_count or 0
+    if not points:
+        print(f"collection {args.collection} is empty")
+        return 1
+
+    if args.queries_file:
+        queries = _file_queries(args.queries_file, args.queries)
+    else:
+        queries = _sample_queries(client, args.collection, args.queries)
+
+    quantization = settings.QDRANT_QUANTIZATION.lower()
+    hnsw = info.config.hnsw_config
+    print(
+        f"{args.collection}: {points} points, {info.indexed_vectors_count or 0} indexed, "
+        f"m={hnsw.m} ef_construct={hnsw.ef_construct}, quantization={quantization}, "
+        f"on_disk={settings.QDRANT_ON_DISK_VECTORS}"
+    )
+    print(
+        "vector memory (MB, estimate): "
+        + ", ".join(f"{kind} {mb:.1f}" for kind, mb in _vector_mb(points).items())
+    )
+    if (info.indexed_vectors_count or 0) < points:
+        print("note: not every vector is in the HNSW graph yet; unindexed segments are scanned exactly")
+    print(f"{len(queries)} queries, top_k={args.top_k}{', filter ' + args.filter if args.filter else ''}")
+
+    truth = _run(client, args.collection, query_filter, search_params(exact=True), queries, args.top_k)
+
+    variants: List[Tuple[str, Any]] = [("exact", search_params(exact=True))]
+    for ef in ef_values:
+        if quantization == "none":
+            variants.append((f"ef={ef}", search_params(hnsw_ef=ef)))
+        else:
+            variants.append((f"ef={ef} rescore", search_params(hnsw_ef=ef, rescore=True)))
+            variants.append((f"ef={ef} no rescore", search_params(hnsw_ef=ef, rescore=False)))
+
+    print(f"{'search':<20} {'recall':>7} {'min':>6} {'p50 ms':>7} {'p95 ms':>7} {'qps':>7}")
+    for name, params in variants:
+        runs = truth if name == "exact" else _run(
+            client, args.collection, query_filter, params, queries, args.top_k
+        )
+        recalls = [
+            len(set(ids) & set(true_ids)) / len(true_ids)
+            for (ids, _), (true_ids, _) in zip(runs, truth)
+            if true_ids
+        ]
+        latencies = [seconds for _, seconds in runs]
+        total = sum(latencies)
+        print(
+            f"{name:<20} {statistics.mean(recalls) if recalls else float('nan'):>7.3f} "
+            f"{min(recalls) if recalls else float('nan'):>6.2f} "
+            f"{_percentile(latencies, 0.5) * 1000:>7.2f} {_percentile(latencies, 0.95) * 1000:>7.2f} "
+            f"{len(runs) / total if total else 0:>7.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Fill the dedup keys (normalized title, arXiv id/version, abstract MinHash and
+# its LSH bands) for documents stored before dedup existed, then list the
+# duplicate groups already in the table. Nothing is deleted; the report is for
+# deciding what to clean up by hand.
+#
+#   python -m scripts.build_dedup_index
+#   python -m scripts.build_dedup_index --report-only
+import argparse
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import load_only
+
+from app.core.db import SessionLocal
+from app.memory.dedup import DEDUP_NEW, DedupIndex, document_signature, write_bands
+from app.memory.document_store import iter_document_batches
+from app.memory.models import Document
+
+
+def backfill(batch_size: int) -> int:
+    db = SessionLocal()
+    count = 0
+    try:
+        query = (
+            db.query(Document)
+            .options(load_only(Document.id, Document.title, Document.abstract, Document.url, Document.pdf_url))
+            .filter(Document.norm_title.is_(None))
+        )
+        for docs in iter_document_batches(db, query, batch_size=batch_size):
+            rows: List[Tuple[int, Dict]] = [
+                (doc.id, document_signature(doc.title, doc.abstract, doc.url, doc.pdf_url))
+                for doc in docs
+            ]
+            db.bulk_update_mappings(Document, [{"id": doc_id, **sig} for doc_id, sig in rows])
+            write_bands(db, rows, replace=True)
+            count += len(rows)
+            print(f"indexed {count} documents")
+    finally:
+        db.close()
+    return count
+
+
+def report(batch_size: int) -> int:
+    db = SessionLocal()
+    index = DedupIndex()
+    groups: Dict[int, List[int]] = {}
+    try:
+        query = db.query(
+            Document.id,
+            Document.norm_title,
+            Document.arxiv_id,
+            Document.arxiv_version,
+            Document.minhash,
+        )
+        for rows in iter_document_batches(db, query, batch_size=batch_size):
+            for doc_id, norm_title, arxiv_id, arxiv_version, minhash in rows:
+                row = {
+                    "norm_title": norm_title,
+                    "arxiv_id": arxiv_id,
+                    "arxiv_version": arxiv_version,
+                    "minhash": minhash,
+                }
+                status, key = index.match(row)
+                if status == DEDUP_NEW:
+                    index.add(doc_id, row)
+                else:
+                    groups.setdefault(key, []).append(doc_id)
+    finally:
+        db.close()
+
+    for canonical, duplicates in sorted(groups.items()):
+        print(f"{canonical}: {', '.join(str(d) for d in duplicates)}")
+    print(f"{len(groups)} groups, {sum(len(d) for d in groups.values())} duplicate documents")
+    return len(groups)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args()
+
+    if not args.report_only:
+        backfill(args.batch_size)
+    report(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
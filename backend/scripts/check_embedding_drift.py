@@ -0,0 +1,96 @@
+# Cosine-drift and speed check for the ONNX embedding backend.
+#
+# Encodes the same texts with the PyTorch model and with the ONNX model
+# (int8-quantized unless --no-quantize) and reports per-text cosine similarity
+# and encode throughput. Switch EMBEDDING_BACKEND to "onnx" only when the minimum
+# cosine stays above the threshold (default 0.99) on our own passages.
+#
+#   python -m scripts.check_embedding_drift                 # body chunks from Postgres
+#   python -m scripts.check_embedding_drift --file sample.txt --quant-config avx512_vnni
+import argparse
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+from app.memory.embeddings import BACKEND_ONNX, BACKEND_TORCH, load_embedding_model
+
+
+def _load_from_db(limit: int) -> List[str]:
+    from app.core.db import SessionLocal
+    from app.memory.models import Document
+    from app.services.vectorization_service import _chunk_text
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Document.clean_text)
+            .filter(Document.clean_text.isnot(None))
+            .order_by(Document.id)
+            .limit(max(1, limit // 10))
+            .all()
+        )
+    finally:
+        db.close()
+
+    texts: List[str] = []
+    for (clean_text,) in rows:
+        texts.extend(c["text"] for c in _chunk_text(clean_text))
+    return texts[:limit]
+
+
+def _load_from_file(path: str, limit: int) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    return texts[:limit]
+
+
+def _encode(model, texts: List[str], batch_size: int):
+    model.encode(texts[:batch_size], normalize_embeddings=True, batch_size=batch_size)
+    t0 = time.perf_counter()
+    vectors = model.encode(texts, normalize_embeddings=True, batch_size=batch_size)
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--quant-config", default="avx2")
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.99)
+    args = parser.parse_args()
+
+    texts = _load_from_file(args.file, args.limit) if args.file else _load_from_db(args.limit)
+    if not texts:
+        print("no texts to encode")
+        return 1
+
+    reference = load_embedding_model(BACKEND_TORCH)
+    candidate = load_embedding_model(
+        BACKEND_ONNX,
+        quantize=not args.no_quantize,
+        quant_config=args.quant_config,
+    )
+
+    ref_vecs, ref_s = _encode(reference, texts, args.batch_size)
+    cand_vecs, cand_s = _encode(candidate, texts, args.batch_size)
+
+    cosines = np.sum(ref_vecs * cand_vecs, axis=1)
+
+    label = "onnx" if args.no_quantize else f"onnx-qint8-{args.quant_config}"
+    print(f"texts:          {len(texts)}")
+    print(f"torch:          {ref_s:.2f}s  {len(texts) / ref_s:.1f} texts/s")
+    print(f"{label + ':':<15} {cand_s:.2f}s  {len(texts) / cand_s:.1f} texts/s")
+    print(f"speedup:        {ref_s / cand_s:.2f}x")
+    print(f"cosine mean:    {cosines.mean():.5f}")
+    print(f"cosine p01:     {np.percentile(cosines, 1):.5f}")
+    print(f"cosine min:     {cosines.min():.5f}  (threshold {args.threshold})")
+
+    return 0 if cosines.min() >= args.threshold else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+# Harvest arXiv metadata into the documents table, resuming from the query's
+# cursor (harvest_cursors). Same thing as POST /api/harvester/arxiv/run, but in
+# the foreground and without pushing new documents through ingestion (run
+# POST /api/ingestion/run afterwards).
+#
+#   python -m scripts.harvest_arxiv --max-results 1000
+#   python -m scripts.harvest_arxiv --reset --query 'cat:cs.IR'
+import argparse
+
+from app.core.db import SessionLocal
+from app.services.arxiv_harvester import ArxivHarvester
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--query")
+    parser.add_argument("--max-results", type=int)
+    parser.add_argument("--api-url")
+    parser.add_argument("--page-size", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--interval", type=float, help="seconds between requests")
+    parser.add_argument("--reset", action="store_true", help="start the query from the beginning")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        harvester = ArxivHarvester(
+            db,
+            query=args.query,
+            api_url=args.api_url,
+            page_size=args.page_size,
+            concurrency=args.concurrency,
+            request_interval_s=args.interval,
+        )
+        if args.reset:
+            harvester.reset()
+        stats = harvester.run(args.max_results)
+
+        cursor = harvester.cursor()
+        print(", ".join(f"{k}={v}" for k, v in stats.items()))
+        print(f"cursor {cursor.id}: next_start={cursor.next_start} total={cursor.total_results}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.chunking import _sentences  # noqa: E402
+
+
+def test_sentences_keep_closing_quotes_and_brackets():
+    text = '(Smith et al., 2020.) The model "works." It does.'
+    assert _sentences(text) == ['(Smith et al., 2020.)', 'The model "works."', "It does."]
+
+
+def test_rejoined_sentences_reproduce_the_input():
+    for text in [
+        '(Smith et al., 2020.) The model "works." It [really] does!) And "why?" [1] Yes.',
+        "No split here e.g. at lowercase. 3.5 is a number... Done",
+        "One sentence only",
+    ]:
+        assert " ".join(_sentences(text)) == text